@@ -0,0 +1,350 @@
+import os
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import DateTime, bindparam, inspect, text
+
+from . import dialects, rollup
+
+# How long a fetched (range, dev_ids) aggregate is reused by other dashboard requests
+AGGREGATE_TTL = float(os.getenv("AGGREGATE_TTL", "30"))
+AGGREGATE_MAX_ENTRIES = int(os.getenv("AGGREGATE_MAX_ENTRIES", "32"))
+# Read closed hours from environment_hourly_rollup instead of re-aggregating raw readings
+USE_ROLLUP = os.getenv("USE_ROLLUP", "1") == "1"
+# `since` bound as a DateTime, so each dialect gets create_time's own storage format;
+# SQLite stores '2025-10-01 14:00:00.000000', which a plain string bind would compare as text
+SINCE_PARAM = bindparam("since", type_=DateTime())
+
+
+# Column expressions for environment_monitor. The varchar/HOUR() forms cast every row;
+# backend/migrate_indexes.py adds stored numeric columns covered by one index.
+def legacy_columns(dialect):
+    """Expressions on the raw varchar/datetime columns, spelled for `dialect`."""
+    return {
+        "day": dialects.date_sql(dialect),
+        "hour": dialects.hour_sql(dialect),
+        "temp": dialects.number_sql(dialect, "temp_num"),
+        "rh": dialects.number_sql(dialect, "rh_num"),
+    }
+
+
+LEGACY_COLUMNS = legacy_columns(dialects.MYSQL)
+SHADOW_COLUMNS = {"day": "DATE(create_time)", "hour": "hour_of_day", "temp": "temp_val", "rh": "rh_val"}
+# Stored columns the migration adds
+SHADOW_COLUMN_NAMES = ("hour_of_day", "temp_val", "rh_val")
+
+# database url -> whether the shadow columns exist (checked once per process)
+_shadow_available = {}
+
+
+def raw_columns(db):
+    """SHADOW_COLUMNS once the migration has been applied, otherwise the legacy columns for the dialect."""
+    bind = db.get_bind()
+    key = str(bind.url)
+    if key not in _shadow_available:
+        try:
+            names = {c["name"] for c in inspect(bind).get_columns("environment_monitor")}
+        except Exception:
+            names = set()
+        _shadow_available[key] = set(SHADOW_COLUMN_NAMES) <= names
+    return SHADOW_COLUMNS if _shadow_available[key] else legacy_columns(bind.dialect.name)
+
+
+def build_where(start_obj, end_obj, dev_ids=None, columns=LEGACY_COLUMNS):
+    """WHERE clause shared by every dashboard query: working hours 9-18, valid temp/RH readings."""
+    where_conditions = [
+        "create_time >= :start_date",
+        "create_time < :end_date",
+        f"{columns['hour']} BETWEEN 9 AND 18",
+        f"{columns['temp']} > 0",
+        f"{columns['rh']} > 0"
+    ]
+    query_params = {
+        "start_date": start_obj.isoformat(),
+        "end_date": (end_obj + timedelta(days=1)).isoformat(),
+    }
+
+    if dev_ids and len(dev_ids) > 0:
+        where_conditions.append(dialects.in_list("dev_id", "dev_id", dev_ids, query_params))
+
+    return " AND ".join(where_conditions), query_params
+
+
+class HourlyAggregates:
+    """
+    (day, hour, sum, count) rows for a range, ordered by day and hour.
+    Averages are derived from sums and counts, so daily values equal AVG over the raw readings.
+    """
+
+    def __init__(self, days, hours, sum_temp, sum_rh, counts, devices=None):
+        self.days = np.asarray(days, dtype="datetime64[D]")
+        self.hours = np.asarray(hours, dtype=np.int64)
+        self.sum_temp = np.asarray(sum_temp, dtype=float)
+        self.sum_rh = np.asarray(sum_rh, dtype=float)
+        self.counts = np.asarray(counts, dtype=float)
+        # dev_id per cell for per-device aggregates, None when devices are pooled
+        self.devices = np.asarray(devices, dtype=object) if devices is not None else None
+
+    def __len__(self):
+        return len(self.days)
+
+    def slice(self, start_obj, end_obj):
+        mask = (self.days >= np.datetime64(start_obj, "D")) & (self.days <= np.datetime64(end_obj, "D"))
+        return HourlyAggregates(
+            self.days[mask], self.hours[mask], self.sum_temp[mask], self.sum_rh[mask], self.counts[mask],
+            self.devices[mask] if self.devices is not None else None,
+        )
+
+    def hourly(self):
+        """Returns (day strings, hours, avg_temp, avg_rh) per (day, hour) cell."""
+        return (
+            self.days.astype(str).tolist(),
+            self.hours,
+            self.sum_temp / self.counts,
+            self.sum_rh / self.counts,
+        )
+
+    def daily(self):
+        """Returns (day strings, avg_temp, avg_rh) per day, rolled up from the hourly cells."""
+        unique_days, inverse = np.unique(self.days, return_inverse=True)
+        counts = np.bincount(inverse, weights=self.counts, minlength=len(unique_days))
+        sum_temp = np.bincount(inverse, weights=self.sum_temp, minlength=len(unique_days))
+        sum_rh = np.bincount(inverse, weights=self.sum_rh, minlength=len(unique_days))
+        return unique_days.astype(str).tolist(), sum_temp / counts, sum_rh / counts
+
+
+def raw_hourly_sql(where_clause, columns=LEGACY_COLUMNS, by_device=False):
+    device_column = "dev_id, " if by_device else ""
+    return text(f"""
+        SELECT
+            {device_column}{columns['day']} AS day,
+            {columns['hour']} AS hour,
+            SUM({columns['temp']}) AS sum_temp,
+            SUM({columns['rh']}) AS sum_rh,
+            COUNT(*) AS n
+        FROM environment_monitor
+        WHERE {where_clause}
+        GROUP BY {device_column}day, hour
+        ORDER BY day, hour{", dev_id" if by_device else ""}
+    """)
+
+
+def _raw_hourly_query(db, start_obj, end_obj, dev_ids=None, since=None, by_device=False):
+    columns = raw_columns(db)
+    where_clause, query_params = build_where(start_obj, end_obj, dev_ids, columns)
+    sql_query = raw_hourly_sql(where_clause + (" AND create_time >= :since" if since is not None else ""), columns, by_device)
+    if since is not None:
+        query_params["since"] = since
+        sql_query = sql_query.bindparams(SINCE_PARAM)
+    return sql_query, query_params
+
+
+def _rollup_hourly_query(start_obj, end_obj, dev_ids, watermark, by_device=False):
+    where_conditions = [
+        "day >= :start_day",
+        "day <= :end_day",
+        "hour BETWEEN 9 AND 18",
+        # only hours the rollup job has closed
+        "(day < :wm_day OR (day = :wm_day AND hour < :wm_hour))",
+    ]
+    query_params = {
+        "start_day": start_obj.isoformat(),
+        "end_day": end_obj.isoformat(),
+        "wm_day": watermark.date().isoformat(),
+        "wm_hour": watermark.hour,
+    }
+    if dev_ids and len(dev_ids) > 0:
+        where_conditions.append(dialects.in_list("dev_id", "dev_id", dev_ids, query_params))
+
+    device_column = "dev_id, " if by_device else ""
+    sql_query = text(f"""
+        SELECT
+            {device_column}day,
+            hour,
+            SUM(temp_sum) AS sum_temp,
+            SUM(rh_sum) AS sum_rh,
+            SUM(temp_count) AS n
+        FROM environment_hourly_rollup
+        WHERE {" AND ".join(where_conditions)}
+        GROUP BY {device_column}day, hour
+        HAVING SUM(temp_count) > 0
+        ORDER BY day, hour{", dev_id" if by_device else ""}
+    """)
+    return sql_query, query_params
+
+
+def _hourly_queries(db, start_obj, end_obj, dev_ids=None, by_device=False):
+    """
+    Closed hours come from environment_hourly_rollup; only readings at or after the rollup
+    watermark (normally just the current, still-open hour) are aggregated from raw data.
+    Falls back to raw data for the whole range if the rollup was never built.
+    Returns [(sql, params), ...] whose results, concatenated, are ordered by day and hour
+    (and dev_id with by_device, which keeps one cell per device instead of pooling them).
+    """
+    watermark = None
+    if USE_ROLLUP:
+        try:
+            watermark = rollup.get_watermark(db)
+        except Exception:
+            # rollup tables missing (e.g. no CREATE permission): raw data only
+            db.rollback()
+    if watermark is None:
+        return [_raw_hourly_query(db, start_obj, end_obj, dev_ids, by_device=by_device)]
+    if watermark.date() > end_obj:
+        return [_rollup_hourly_query(start_obj, end_obj, dev_ids, watermark, by_device)]
+    # The watermark is hour-aligned, so the two parts never share a (day, hour) cell
+    return [
+        _rollup_hourly_query(start_obj, end_obj, dev_ids, watermark, by_device),
+        _raw_hourly_query(db, start_obj, end_obj, dev_ids, since=watermark, by_device=by_device),
+    ]
+
+
+def _to_aggregates(results, by_device=False):
+    return HourlyAggregates(
+        [str(row.day) for row in results],
+        [int(row.hour) for row in results],
+        [float(row.sum_temp) for row in results],
+        [float(row.sum_rh) for row in results],
+        [int(row.n) for row in results],
+        [row.dev_id for row in results] if by_device else None,
+    )
+
+
+def query_hourly(db, start_obj, end_obj, dev_ids=None, by_device=False):
+    results = []
+    for sql_query, query_params in _hourly_queries(db, start_obj, end_obj, dev_ids, by_device):
+        results += db.execute(sql_query, query_params).fetchall()
+    return _to_aggregates(results, by_device)
+
+
+def iter_hourly(db, start_obj, end_obj, dev_ids=None, chunk_rows=2000):
+    """
+    query_hourly as a sequence of HourlyAggregates of at most chunk_rows cells each,
+    read through a server-side cursor so memory doesn't grow with the range.
+    """
+    for sql_query, query_params in _hourly_queries(db, start_obj, end_obj, dev_ids):
+        result = db.execute(sql_query.execution_options(stream_results=True), query_params)
+        for partition in result.partitions(chunk_rows):
+            yield _to_aggregates(partition)
+
+
+def watermark_time(value):
+    """create_time as the driver returns it (datetime, or the stored string on SQLite) -> datetime."""
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value))
+
+
+def format_watermark(value):
+    """'YYYY-MM-DD HH:MM:SS', with the fraction kept when there is one so it is never cut below the stored value."""
+    value = watermark_time(value)
+    return None if value is None else value.isoformat(sep=" ")
+
+
+def latest_reading(db, start_obj, end_obj, dev_ids=None):
+    """create_time of the newest reading the dashboards would use, as 'YYYY-MM-DD HH:MM:SS' (None if none)."""
+    columns = raw_columns(db)
+    where_clause, query_params = build_where(start_obj, end_obj, dev_ids, columns)
+    sql_query = text(f"SELECT MAX(create_time) AS latest FROM environment_monitor WHERE {where_clause}")
+    return format_watermark(db.execute(sql_query, query_params).scalar())
+
+
+def query_changes(db, start_obj, end_obj, dev_ids, since):
+    """
+    (day, hour) cells with readings newer than `since`, and the new watermark.
+    Readings are matched on create_time, so rows inserted later with an older timestamp
+    only show up on a full refresh.
+    """
+    columns = raw_columns(db)
+    where_clause, query_params = build_where(start_obj, end_obj, dev_ids, columns)
+    query_params["since"] = watermark_time(since)
+    sql_query = text(f"""
+        SELECT
+            {columns['day']} AS day,
+            {columns['hour']} AS hour,
+            MAX(create_time) AS latest
+        FROM environment_monitor
+        WHERE {where_clause} AND create_time > :since
+        GROUP BY day, hour
+        ORDER BY day, hour
+    """).bindparams(SINCE_PARAM)
+    results = db.execute(sql_query, query_params).fetchall()
+    cells = [(str(row.day), int(row.hour)) for row in results]
+    latest = max((watermark_time(row.latest) for row in results), default=query_params["since"])
+    return cells, format_watermark(latest)
+
+
+class AggregationService:
+    """
+    Fetches hourly aggregates once per (range, dev_ids) and shares them between endpoints.
+    A fresh entry whose range covers the requested one is sliced instead of re-queried,
+    and concurrent requests for the same key wait for the single in-flight query.
+    """
+
+    def __init__(self, ttl=AGGREGATE_TTL, max_entries=AGGREGATE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = {}
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.stats = {"queries": 0, "hits": 0}
+
+    @staticmethod
+    def _dev_key(dev_ids):
+        return tuple(sorted(set(dev_ids))) if dev_ids else ()
+
+    def _find(self, dev_key, start_obj, end_obj, now):
+        for (key_devs, key_start, key_end), (fetched_at, aggregates) in self._entries.items():
+            if key_devs == dev_key and key_start <= start_obj and key_end >= end_obj and now - fetched_at < self.ttl:
+                return aggregates.slice(start_obj, end_obj)
+        return None
+
+    def get(self, db, start_obj, end_obj, dev_ids=None):
+        dev_key = self._dev_key(dev_ids)
+        key = (dev_key, start_obj, end_obj)
+        with self._lock:
+            cached = self._find(dev_key, start_obj, end_obj, time.monotonic())
+            if cached is not None:
+                self.stats["hits"] += 1
+                return cached
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[key] = future
+            else:
+                self.stats["hits"] += 1
+
+        if not owner:
+            return future.result()
+
+        try:
+            aggregates = query_hourly(db, start_obj, end_obj, dev_ids)
+        except Exception as e:
+            with self._lock:
+                self._inflight.pop(key, None)
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            self.stats["queries"] += 1
+            now = time.monotonic()
+            self._entries = {
+                k: v for k, v in self._entries.items() if now - v[0] < self.ttl
+            }
+            while len(self._entries) >= self.max_entries:
+                self._entries.pop(min(self._entries, key=lambda k: self._entries[k][0]))
+            self._entries[key] = (now, aggregates)
+            self._inflight.pop(key, None)
+        future.set_result(aggregates)
+        return aggregates
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+aggregation_service = AggregationService()
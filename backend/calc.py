@@ -1,25 +1,59 @@
+import hashlib
+import json
 import math
+import os
 import numpy as np
-from scipy.optimize import curve_fit
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
 
-from .clo_predictor import CLOPredictor
-import os
+from .model_registry import ModelRegistry
+from . import devices, dialects
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+import contextvars
+import threading
+import time
 
 # Global cache for fitted Fourier parameters
 FOURIER_PARAMS = None
+FOURIER_HARMONICS = 4
+# Persisted fit: {"params", "harmonics", "last_day", "n_days", "r2", "fitted_at", "source"}
+# "source" identifies the data behind the fit: {"database", "rows", "first_time", "last_time"}
+FOURIER_CACHE_PATH = os.path.join(os.path.dirname(__file__), 'models', 'fourier_params.json')
+FOURIER_FIT_INFO = None
+
+# Per-device / per-floor Fourier models: "device:<dev_id>" / "floor:<floor_key>" -> {"params", "n_days", "r2"}
+CLO_MODELS = {}
+# Persisted per-device fit: {"models", "harmonics", "min_days", "fitted_at", "source"}, so other
+# workers and restarts load it instead of refitting while the data is unchanged
+CLO_MODELS_CACHE_PATH = os.path.join(os.path.dirname(__file__), 'models', 'clo_models.json')
+CLO_MODEL_MIN_DAYS = int(os.getenv("CLO_MODEL_MIN_DAYS", "120"))
+CLO_MODEL_WORKERS = int(os.getenv("CLO_MODEL_WORKERS", str(os.cpu_count() or 1)))
+_model_clo_tables = {}
 MODEL_PATH = os.path.join(os.path.dirname(__file__), 'models', 'best_clo_model.json')
-predictor = None
+# Prefer the compact binary model when it has been generated (backend/convert_model.py)
+if os.path.exists(os.path.splitext(MODEL_PATH)[0] + '.npz'):
+    MODEL_PATH = os.path.splitext(MODEL_PATH)[0] + '.npz'
+# Seconds between checks of the model file for changes (0 disables hot reload)
+MODEL_RELOAD_INTERVAL = float(os.getenv("MODEL_RELOAD_INTERVAL", "5"))
+model_registry = ModelRegistry(MODEL_PATH, poll_interval=MODEL_RELOAD_INTERVAL)
+
+# Day-of-year CLO tables, rebuilt whenever FOURIER_PARAMS or the loaded predictor changes
+CLO_STRATEGIES = ("fourier", "month", "fixed_summer", "fixed_winter", "predictor")
+CLO_TABLES = None
+_clo_tables_key = None
+
+# Clothing-surface-temperature solver: "fixed_point" is the VBA-aligned damped iteration,
+# "newton" solves the heat balance directly and falls back to fixed_point if it fails
+TCL_SOLVERS = ("fixed_point", "newton")
+TCL_SOLVER = os.getenv("PMV_TCL_SOLVER", "fixed_point")
+
+# Solver telemetry, aggregated per label (endpoints set the label via solver_telemetry)
+SOLVER_STATS = {}
+_solver_stats_lock = threading.Lock()
+_solver_label = contextvars.ContextVar("solver_label", default="default")
 
 def get_predictor():
-    global predictor
-    if predictor is None:
-        if os.path.exists(MODEL_PATH):
-            predictor = CLOPredictor(MODEL_PATH)
-        else:
-            # Fallback to an empty predictor or one that uses defaults
-            predictor = CLOPredictor("default") 
-    return predictor
+    return model_registry.get()
 
 def fourier_series(x, *params):
     # 按照用户提供的公式: n_harmonics = len(params) // 2 - 1
@@ -35,26 +69,112 @@ def apply_physical_constraints(clo_values):
     # Standard CLO constraints (typically between 0.3 and 1.5)
     return np.clip(clo_values, 0.3, 1.5)
 
-def fit_fourier_coefficients(db_session):
+def _fourier_design(x, n_harmonics=FOURIER_HARMONICS):
+    """Design matrix [1, cos(wx), sin(wx), ..., cos(nwx), sin(nwx)], column order as in fourier_series_vec."""
+    x = np.asarray(x, dtype=float)
+    omega = 2 * np.pi / 365
+    columns = [np.ones_like(x)]
+    for n in range(1, n_harmonics + 1):
+        columns.append(np.cos(n * omega * x))
+        columns.append(np.sin(n * omega * x))
+    return np.stack(columns, axis=-1)
+
+# One row per possible day-of-year value, so a fit only gathers rows
+FOURIER_DESIGN = _fourier_design(np.arange(367))
+
+def database_fingerprint(url):
+    """Short hash of a database URL (without the password), so a cache is only reused on its own database."""
+    from sqlalchemy.engine import make_url
+    rendered = make_url(url).render_as_string(hide_password=True)
+    return hashlib.sha256(rendered.encode("utf-8")).hexdigest()[:16]
+
+def _fit_source(db_session):
+    """Database, row count and time range of environment_monitor; a persisted fit is reused only while these match."""
+    from sqlalchemy import text
+    rows, first, last = db_session.execute(
+        text("SELECT COUNT(*), MIN(create_time), MAX(create_time) FROM environment_monitor")
+    ).one()
+    return {
+        "database": database_fingerprint(db_session.get_bind().url),
+        "rows": int(rows),
+        "first_time": None if first is None else str(first),
+        "last_time": None if last is None else str(last),
+    }
+
+def load_fourier_cache(path=None, database_url=None):
+    """
+    Restore the last persisted fit so CLO is available before any refit finishes.
+    With `database_url`, a cache fitted on another database is ignored.
+    """
+    global FOURIER_PARAMS, FOURIER_FIT_INFO
+    path = path or FOURIER_CACHE_PATH
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            info = json.load(f)
+        if info.get("harmonics") != FOURIER_HARMONICS:
+            print(f"Ignoring Fourier cache at {path}: fitted with {info.get('harmonics')} harmonics")
+            return None
+        if database_url is not None and (info.get("source") or {}).get("database") != database_fingerprint(database_url):
+            print(f"Ignoring Fourier cache at {path}: fitted on a different database")
+            return None
+        FOURIER_FIT_INFO = info
+        FOURIER_PARAMS = info["params"]
+        print(f"Loaded Fourier parameters from {path} (data up to {info['last_day']})")
+        return FOURIER_PARAMS
+    except Exception as e:
+        print(f"Error reading Fourier cache from {path}: {e}")
+        return None
+
+def _write_json(path, data):
+    # Write then rename, so a worker reading the cache never sees a half-written file
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+def save_fourier_cache(path=None):
+    path = path or FOURIER_CACHE_PATH
+    try:
+        _write_json(path, FOURIER_FIT_INFO)
+    except Exception as e:
+        print(f"Could not persist Fourier parameters to {path}: {e}")
+
+def fit_fourier_coefficients(db_session, force=False, source=None):
     """
     Fits Fourier 4-term coefficients based on historical data.
     As per user instruction: 
     1. Read 9-18h data.
     2. Calculate base CLO (using dynamic_temp).
     3. Fit Fourier 4-harmonic series.
+    The series is linear in its parameters, so the fit is a single least-squares solve
+    on rows of FOURIER_DESIGN. Skipped (unless `force`) while the database, row count
+    and time range of environment_monitor match the ones the persisted fit was made on.
+    `source` is a _fit_source result already read by the caller.
     """
     from sqlalchemy import text
-    global FOURIER_PARAMS
+    global FOURIER_PARAMS, FOURIER_FIT_INFO
     
     try:
+        source = source or _fit_source(db_session)
+        if source["last_time"] is None:
+            return None
+        latest_day = source["last_time"][:10]
+        if not force and FOURIER_FIT_INFO is not None and FOURIER_FIT_INFO.get("source") == source:
+            print(f"Fourier fitting skipped: data unchanged since the fit on {FOURIER_FIT_INFO['fitted_at']}")
+            return FOURIER_PARAMS
+
         # Get daily 9-18h avg temp for the last year of data to perform fitting
-        sql = text("""
+        dialect = dialects.dialect_name(db_session)
+        temp = dialects.number_sql(dialect, "temp_num")
+        sql = text(f"""
             SELECT 
-                DATE(create_time) AS day,
-                AVG(temp_num) AS avg_temp
+                {dialects.date_sql(dialect)} AS day,
+                AVG({temp}) AS avg_temp
             FROM environment_monitor
-            WHERE temp_num > 0
-              AND HOUR(create_time) BETWEEN 9 AND 18
+            WHERE {temp} > 0
+              AND {dialects.hour_sql(dialect)} BETWEEN 9 AND 18
             GROUP BY day
             ORDER BY day
         """)
@@ -76,22 +196,187 @@ def fit_fourier_coefficients(db_session):
             days.append(doy)
             clos.append(base_clo)
 
-        X = np.array(days)
+        X = FOURIER_DESIGN[np.array(days)]
         y = np.array(clos)
 
-        n_harm = 4
-        p0 = [np.mean(y)] + [0.1] * (2 * n_harm)
-        params, _ = curve_fit(fourier_series_vec, X, y, p0=p0, maxfev=10000)
-        
+        params, *_ = np.linalg.lstsq(X, y, rcond=None)
+        ss_res = float(np.sum((y - X @ params) ** 2))
+        ss_tot = float(np.sum((y - y.mean()) ** 2))
+        r2 = 1 - ss_res / ss_tot if ss_tot > 0 else 1.0
+
         FOURIER_PARAMS = params.tolist()
-        print(f"Fourier fitting completed. R^2 is likely high. Parameters: {FOURIER_PARAMS}")
+        FOURIER_FIT_INFO = {
+            "params": FOURIER_PARAMS,
+            "harmonics": FOURIER_HARMONICS,
+            "last_day": latest_day,
+            "n_days": len(days),
+            "r2": r2,
+            "fitted_at": datetime.now().isoformat(timespec="seconds"),
+            "source": source,
+        }
+        save_fourier_cache()
+        print(f"Fourier fitting completed on {len(days)} days, R^2 = {r2:.4f}. Parameters: {FOURIER_PARAMS}")
         return FOURIER_PARAMS
     except Exception as e:
         print(f"Fourier fitting failed: {e}")
         return None
 
+def _fit_fourier_task(key, doys, clos):
+    """Least-squares fit of one model; top-level so it can run in a worker process."""
+    X = FOURIER_DESIGN[doys]
+    params, *_ = np.linalg.lstsq(X, clos, rcond=None)
+    ss_res = float(np.sum((clos - X @ params) ** 2))
+    ss_tot = float(np.sum((clos - clos.mean()) ** 2))
+    r2 = 1 - ss_res / ss_tot if ss_tot > 0 else 1.0
+    return key, params.tolist(), r2, len(doys)
+
+def _dynamic_temp_clo_vec(ta):
+    """Array version of get_clo_value("dynamic_temp", ta)."""
+    return np.where(ta >= 26, 0.3, np.where(ta <= 20, 1.0, 1.0 + (ta - 20) * (-0.1167)))
+
+def _load_clo_models_cache(source, path=None):
+    """Models persisted for exactly this data `source` (and the current settings), else None."""
+    path = path or CLO_MODELS_CACHE_PATH
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            info = json.load(f)
+    except Exception as e:
+        print(f"Error reading CLO model cache from {path}: {e}")
+        return None
+    if (info.get("source") != source or info.get("harmonics") != FOURIER_HARMONICS
+            or info.get("min_days") != CLO_MODEL_MIN_DAYS):
+        return None
+    return info["models"]
+
+def _save_clo_models_cache(source, path=None):
+    path = path or CLO_MODELS_CACHE_PATH
+    try:
+        _write_json(path, {
+            "models": CLO_MODELS,
+            "harmonics": FOURIER_HARMONICS,
+            "min_days": CLO_MODEL_MIN_DAYS,
+            "fitted_at": datetime.now().isoformat(timespec="seconds"),
+            "source": source,
+        })
+    except Exception as e:
+        print(f"Could not persist CLO models to {path}: {e}")
+
+def fit_clo_models(db_session, workers=None, force=False, source=None):
+    """
+    Fits per-device and per-floor Fourier models from one grouped query.
+    Floors are aggregated from the device sums/counts, so a floor's daily average
+    weighs readings exactly like the global fit. Models with fewer than
+    CLO_MODEL_MIN_DAYS days of data are skipped. The fits run in a process pool.
+    Unless `force`, models persisted for the same data (see _fit_source) are loaded instead.
+    `source` is a _fit_source result already read by the caller.
+    """
+    from sqlalchemy import text
+    global CLO_MODELS, _model_clo_tables
+
+    try:
+        source = source or _fit_source(db_session)
+        cached = None if force else _load_clo_models_cache(source)
+        if cached is not None:
+            CLO_MODELS = cached
+            _model_clo_tables = {}
+            print(f"Per-device CLO models loaded from {CLO_MODELS_CACHE_PATH}: {len(CLO_MODELS)} models")
+            return CLO_MODELS
+
+        dialect = dialects.dialect_name(db_session)
+        temp = dialects.number_sql(dialect, "temp_num")
+        sql = text(f"""
+            SELECT
+                dev_id,
+                {dialects.date_sql(dialect)} AS day,
+                SUM({temp}) AS sum_temp,
+                COUNT(*) AS n
+            FROM environment_monitor
+            WHERE {temp} > 0
+              AND {dialects.hour_sql(dialect)} BETWEEN 9 AND 18
+            GROUP BY dev_id, day
+        """)
+        results = db_session.execute(sql).fetchall()
+        if not results:
+            return CLO_MODELS
+
+        dev_ids = np.array([row.dev_id for row in results], dtype=object)
+        days = np.array([str(row.day) for row in results], dtype="datetime64[D]")
+        sums = np.array([float(row.sum_temp) for row in results])
+        counts = np.array([int(row.n) for row in results], dtype=float)
+        doys = (days - days.astype("datetime64[Y]").astype("datetime64[D]")).astype(np.intp) + 1
+
+        floor_of = {d: devices.floor_key(d) for d in set(dev_ids)}
+        floors = np.array([floor_of[d] or "" for d in dev_ids], dtype=object)
+
+        tasks = []
+        for prefix, keys in (("device", dev_ids), ("floor", floors)):
+            groups = {}
+            for i, key in enumerate(keys):
+                if key:
+                    groups.setdefault(key, []).append(i)
+            for key, idx in groups.items():
+                idx = np.array(idx)
+                # Combine all rows of the group that fall on the same day
+                day_codes, inverse = np.unique(days[idx], return_inverse=True)
+                if len(day_codes) < CLO_MODEL_MIN_DAYS:
+                    continue
+                day_sums = np.bincount(inverse, weights=sums[idx])
+                day_counts = np.bincount(inverse, weights=counts[idx])
+                day_doys = np.zeros(len(day_codes), dtype=np.intp)
+                day_doys[inverse] = doys[idx]
+                tasks.append((f"{prefix}:{key}", day_doys, _dynamic_temp_clo_vec(day_sums / day_counts)))
+
+        if not tasks:
+            print("Per-device CLO fitting: no device or floor has enough days of data")
+            return CLO_MODELS
+
+        workers = max(1, workers or CLO_MODEL_WORKERS)
+        keys, doy_lists, clo_lists = zip(*tasks)
+        chunksize = max(1, len(tasks) // (workers * 4))
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                fitted = list(pool.map(_fit_fourier_task, keys, doy_lists, clo_lists, chunksize=chunksize))
+        except (OSError, RuntimeError) as e:
+            print(f"Process pool unavailable ({e}), fitting CLO models in-process")
+            fitted = list(map(_fit_fourier_task, keys, doy_lists, clo_lists))
+
+        # Swap the whole registry at once so readers never see a half-filled dict
+        CLO_MODELS = {key: {"params": params, "r2": r2, "n_days": n_days} for key, params, r2, n_days in fitted}
+        _model_clo_tables = {}
+        _save_clo_models_cache(source)
+        print(f"Per-device CLO fitting completed: {len(CLO_MODELS)} models")
+        return CLO_MODELS
+    except Exception as e:
+        print(f"Per-device CLO fitting failed: {e}")
+        return CLO_MODELS
+
+def fit_models(db_session, force=False):
+    """The global Fourier fit and the per-device CLO models, keyed on one read of _fit_source."""
+    source = _fit_source(db_session)
+    fit_fourier_coefficients(db_session, force, source)
+    fit_clo_models(db_session, force=force, source=source)
+
+def resolve_clo_model(dev_ids):
+    """
+    Parameters of the CLO model for a device selection, or None to use the global model.
+    Each device maps to its own model, else its floor's model; the selection's
+    parameters are the mean over devices (the series is linear in its parameters).
+    """
+    if not dev_ids or not CLO_MODELS:
+        return None
+    models = CLO_MODELS
+    selected = []
+    for dev_id in dev_ids:
+        model = models.get(f"device:{dev_id}") or models.get(f"floor:{devices.floor_key(dev_id)}")
+        if model is None:
+            return None
+        selected.append(model["params"])
+    return np.mean(selected, axis=0).tolist()
+
 def fourier_series_vec(x, *params):
-    # Vectorized version for curve_fit
+    # Vectorized version of the fitted series
     # Correctly calculate n_harmonics: (total_params - 1) / 2
     n_harmonics = (len(params) - 1) // 2
     omega = 2 * np.pi / 365
@@ -106,12 +391,19 @@ def clo_by_month(date_val):
     month = date_val.month 
     return 0.8 + 0.3 * math.cos(2 * math.pi * (month - 1) / 12) 
 
-def clo_fourier_4(date_val):
+def clo_fourier_4(date_val, dev_ids=None):
     """
     Predict CLO using 4-harmonic Fourier series.
-    Prioritizes the model file if available.
+    Uses the per-device/per-floor model for `dev_ids` when one is fitted,
+    otherwise prioritizes the model file if available.
     """
     global FOURIER_PARAMS
+    model_params = resolve_clo_model(dev_ids)
+    if model_params is not None:
+        # Same basis as _fit_fourier_task: FOURIER_DESIGN row for the 1-based day of year
+        clo = float(FOURIER_DESIGN[date_val.timetuple().tm_yday] @ np.asarray(model_params))
+        return max(min(clo, 1.5), 0.3)
+
     p = get_predictor()
     
     # If a model is loaded and it's a Fourier/seasonal model, use it
@@ -140,10 +432,207 @@ def clo_fourier_4(date_val):
     clo = a0 + a1*math.cos(w*x) + b1*math.sin(w*x) + a2*math.cos(2*w*x) + b2*math.sin(2*w*x) + a3*math.cos(3*w*x) + b3*math.sin(3*w*x) + a4*math.cos(4*w*x) + b4*math.sin(4*w*x)
     return max(min(clo, 1.5), 0.5)
 
-def get_thermal_comfort_vba_base(ta, rh, vel, tr, clo, met):
+def _build_clo_tables(p):
+    """
+    One (2, 366) array per strategy: row 0 for common years, row 1 for leap years,
+    column doy - 1. Filled from the scalar functions so table reads match them exactly.
+    """
+    strategy_funcs = {
+        "fourier": clo_fourier_4,
+        "month": clo_by_month,
+        "fixed_summer": lambda d: 0.5,
+        "fixed_winter": lambda d: 1.0,
+        "predictor": p.predict,
+    }
+    tables = {name: np.full((2, 366), np.nan) for name in strategy_funcs}
+    for leap, year in enumerate((2023, 2024)):
+        start = datetime(year, 1, 1)
+        for i in range(366 if leap else 365):
+            date_val = start + timedelta(days=i)
+            for name, func in strategy_funcs.items():
+                tables[name][leap, i] = func(date_val)
+    # Dec 31 of a common year never reaches column 365; mirror it so lookups stay in bounds
+    for table in tables.values():
+        table[0, 365] = table[0, 364]
+    return tables
+
+def get_clo_tables():
+    global CLO_TABLES, _clo_tables_key
+    p = get_predictor()
+    key = (model_registry.version, id(p), tuple(FOURIER_PARAMS) if FOURIER_PARAMS is not None else None)
+    if CLO_TABLES is None or key != _clo_tables_key:
+        CLO_TABLES = _build_clo_tables(p)
+        _clo_tables_key = key
+    return CLO_TABLES
+
+def clo_state_token():
+    """Changes whenever a CLO strategy may return different values (model swap, Fourier or per-device refit)."""
+    predictor = get_predictor()
+    return (
+        model_registry.version,
+        id(predictor),
+        tuple(FOURIER_PARAMS) if FOURIER_PARAMS is not None else None,
+        id(CLO_MODELS),
+    )
+
+def _get_model_clo_table(params):
+    key = tuple(params)
+    table = _model_clo_tables.get(key)
+    if table is None:
+        # Column doy - 1 holds FOURIER_DESIGN row doy, as in clo_fourier_4's device path
+        table = np.empty((2, 366))
+        table[:] = np.clip(FOURIER_DESIGN[1:] @ np.asarray(params), 0.3, 1.5)
+        table[0, 365] = table[0, 364]
+        _model_clo_tables[key] = table
+    return table
+
+def invalidate_clo_tables(*_):
+    global CLO_TABLES
+    CLO_TABLES = None
+
+model_registry.add_listener(invalidate_clo_tables)
+
+def clo_for_dates(strategy, dates, manual_clo=0.5, dev_ids=None):
+    """
+    CLO for many dates with one vectorized table read.
+    `dates` may contain date/datetime objects or ISO strings; unknown strategies use "fourier",
+    matching the endpoints' behaviour. With `dev_ids`, "fourier" uses the devices' fitted model.
+    """
+    days = np.asarray(dates, dtype="datetime64[D]")
+    if strategy == "manual":
+        return np.full(days.shape, float(manual_clo))
+
+    years = days.astype("datetime64[Y]")
+    doy_idx = (days - years.astype("datetime64[D]")).astype(np.intp)
+    year_num = years.astype(np.int64) + 1970
+    leap = ((year_num % 4 == 0) & (year_num % 100 != 0)) | (year_num % 400 == 0)
+
+    table = get_clo_tables().get(strategy)
+    if table is None or strategy == "fourier":
+        model_params = resolve_clo_model(dev_ids)
+        if model_params is not None:
+            table = _get_model_clo_table(model_params)
+        else:
+            table = get_clo_tables()["fourier"]
+    return table[leap.astype(np.intp), doy_idx]
+
+@contextmanager
+def solver_telemetry(label):
+    """Attribute solver calls made inside the block to `label` in SOLVER_STATS."""
+    token = _solver_label.set(label)
+    try:
+        yield
+    finally:
+        _solver_label.reset(token)
+
+def _record_solver_stats(solver, elements, iterations, max_iterations, non_converged, fallbacks, seconds):
+    label = _solver_label.get()
+    with _solver_stats_lock:
+        entry = SOLVER_STATS.setdefault(label, {
+            "calls": 0,
+            "elements": 0,
+            "iterations": 0,
+            "max_iterations": 0,
+            "non_converged": 0,
+            "fallbacks": 0,
+            "seconds": 0.0,
+            "solvers": {},
+        })
+        entry["calls"] += 1
+        entry["elements"] += elements
+        entry["iterations"] += iterations
+        entry["max_iterations"] = max(entry["max_iterations"], max_iterations)
+        entry["non_converged"] += non_converged
+        entry["fallbacks"] += fallbacks
+        entry["seconds"] += seconds
+        entry["solvers"][solver] = entry["solvers"].get(solver, 0) + 1
+
+def get_solver_stats():
+    with _solver_stats_lock:
+        stats = {}
+        for label, entry in SOLVER_STATS.items():
+            stats[label] = dict(entry, solvers=dict(entry["solvers"]))
+            stats[label]["avg_iterations"] = entry["iterations"] / entry["elements"] if entry["elements"] else 0
+    return stats
+
+def reset_solver_stats():
+    with _solver_stats_lock:
+        SOLVER_STATS.clear()
+
+def _check_solver(solver):
+    solver = solver or TCL_SOLVER
+    if solver not in TCL_SOLVERS:
+        raise ValueError(f"Unknown tcl solver '{solver}', expected one of {TCL_SOLVERS}")
+    return solver
+
+def _tcl_newton(x0, p2, p3, p4, p5, hcf, t_air, tol=1e-9, max_iter=50):
+    """
+    Newton's method on the clothing heat balance
+        f(x) = x * (100 + p3 * hc) - p5 - p4 * hc + p2 * x^4,  hc = max(hcf, 2.38 * |100x - t_air|^0.25)
+    where x is the clothing surface temperature / 100. f is monotonic in x, so Newton converges
+    in a handful of steps where the damped averaging needs dozens.
+    Returns (x, hc, iterations, converged).
+    """
+    x = x0
+    p1 = p3 / 100
+    for n in range(1, max_iter + 1):
+        d = 100 * x - t_air
+        hcn = 2.38 * math.pow(abs(d), 0.25)
+        if hcn > hcf:
+            hc = hcn
+            # d/dx of (p3 * x - p4) * hcn, with p3 * x - p4 = p1 * d
+            dconv = 59.5 * p1 * math.pow(abs(d), 0.25)
+        else:
+            hc = hcf
+            dconv = 0
+        f = x * (100 + p3 * hc) - p5 - p4 * hc + p2 * math.pow(x, 4)
+        fp = 100 + p3 * hc + 4 * p2 * math.pow(x, 3) + dconv
+        step = f / fp
+        x = x - step
+        if not math.isfinite(x):
+            return x0, hcf, n, False
+        if abs(step) < tol:
+            hc = max(hcf, 2.38 * math.pow(abs(100 * x - t_air), 0.25))
+            return x, hc, n, True
+    return x, max(hcf, 2.38 * math.pow(abs(100 * x - t_air), 0.25)), max_iter, False
+
+def _tcl_newton_vec(x0, p2, p3, p4, p5, hcf, t_air, tol=1e-9, max_iter=50):
+    """Array version of _tcl_newton. Returns (x, hc, iterations, converged) arrays."""
+    x = x0.copy()
+    p1 = p3 / 100
+    iterations = np.zeros(x.shape, dtype=np.int64)
+    converged = np.zeros(x.shape, dtype=bool)
+    active = np.arange(x.size)
+    for _ in range(max_iter):
+        if active.size == 0:
+            break
+        xa = x[active]
+        d = 100 * xa - t_air[active]
+        hcn = 2.38 * np.power(np.abs(d), 0.25)
+        natural = hcn > hcf[active]
+        hc = np.where(natural, hcn, hcf[active])
+        dconv = np.where(natural, 59.5 * p1[active] * np.power(np.abs(d), 0.25), 0)
+        f = xa * (100 + p3[active] * hc) - p5[active] - p4[active] * hc + p2[active] * np.power(xa, 4)
+        fp = 100 + p3[active] * hc + 4 * p2[active] * np.power(xa, 3) + dconv
+        step = f / fp
+        x_new = xa - step
+        iterations[active] += 1
+        finite = np.isfinite(x_new)
+        x[active] = np.where(finite, x_new, x0[active])
+        done = np.abs(step) < tol
+        converged[active[done & finite]] = True
+        active = active[~done & finite]
+    hc = np.maximum(hcf, 2.38 * np.power(np.abs(100 * x - t_air), 0.25))
+    return x, hc, iterations, converged
+
+def get_thermal_comfort_vba_base(ta, rh, vel, tr, clo, met, solver=None, info=None):
     """
     Core PMV / PPD calculation logic aligned with VBA implementation.
+    `solver` picks the tcl solver (defaults to TCL_SOLVER); pass a dict as `info`
+    to receive the iteration count and convergence flags of this call.
     """
+    solver = _check_solver(solver)
+    start = time.perf_counter()
     # === C. Vapor Pressure === 
     fnps = math.exp(16.6536 - 4030.183 / (ta + 235)) 
     pa = rh * 10 * fnps 
@@ -170,20 +659,34 @@ def get_thermal_comfort_vba_base(ta, rh, vel, tr, clo, met):
     p4 = p1 * taa 
     p5 = 308.7 - 0.028 * m + p2 * math.pow(tra / 100, 4) 
  
-    xn = tcla / 100 
-    xf = xn 
-    eps = 0.0015 
+    iterations = 0
+    converged = False
+    fallback = False
+    if solver == "newton":
+        xn, hc, iterations, converged = _tcl_newton(tcla / 100, p2, p3, p4, p5, hcf, taa)
+        fallback = not converged
+
+    if solver == "fixed_point" or fallback:
+        xn = tcla / 100 
+        xf = xn 
+        eps = 0.0015 
  
-    for _ in range(500): 
-        xf = (xf + xn) / 2 
-        hcn = 2.38 * math.pow(abs(100 * xf - taa), 0.25) 
-        hc = max(hcf, hcn) 
-        xn_new = (p5 + p4 * hc - p2 * math.pow(xf, 4)) / (100 + p3 * hc) 
-        if abs(xn_new - xf) <= eps: 
-             xn = xn_new 
-             break 
-        xn = xn_new 
+        for _ in range(500): 
+            iterations += 1
+            xf = (xf + xn) / 2 
+            hcn = 2.38 * math.pow(abs(100 * xf - taa), 0.25) 
+            hc = max(hcf, hcn) 
+            xn_new = (p5 + p4 * hc - p2 * math.pow(xf, 4)) / (100 + p3 * hc) 
+            if abs(xn_new - xf) <= eps: 
+                 xn = xn_new 
+                 converged = True
+                 break 
+            xn = xn_new 
  
+    _record_solver_stats(solver, 1, iterations, iterations, int(not converged), int(fallback), time.perf_counter() - start)
+    if info is not None:
+        info.update(solver=solver, iterations=iterations, converged=converged, fallback=fallback)
+
     tcl = 100 * xn - 273 
  
     # === F. Heat losses === 
@@ -200,6 +703,108 @@ def get_thermal_comfort_vba_base(ta, rh, vel, tr, clo, met):
  
     return pmv, ppd
 
+def get_thermal_comfort_vba_vec(ta, rh, vel, tr, clo, met, solver=None, info=None):
+    """
+    Vectorized get_thermal_comfort_vba_base for whole result sets.
+    Inputs are scalars or array-likes broadcast against each other; returns (pmv, ppd) arrays.
+    The clothing-temperature loop only keeps iterating on elements that have not converged yet,
+    so every element follows exactly the same path as the scalar VBA solver.
+    `info` receives per-element iteration counts and convergence flags.
+    """
+    solver = _check_solver(solver)
+    start = time.perf_counter()
+    ta, rh, vel, tr, clo, met = np.broadcast_arrays(
+        *(np.asarray(v, dtype=float) for v in (ta, rh, vel, tr, clo, met))
+    )
+    shape = ta.shape
+    ta, rh, vel, tr, clo, met = (v.ravel() for v in (ta, rh, vel, tr, clo, met))
+
+    # === C. Vapor Pressure ===
+    fnps = np.exp(16.6536 - 4030.183 / (ta + 235))
+    pa = rh * 10 * fnps
+
+    # === D. Basics ===
+    icl = 0.155 * clo
+    m = met * 58.15
+    fcl = np.where(icl < 0.078, 1 + 1.29 * icl, 1.05 + 0.645 * icl)
+
+    hcf = 12.1 * np.power(vel, 0.5)
+    taa = ta + 273
+    tra = tr + 273
+
+    # === E. Initial clothing temperature ===
+    tcla = taa + (35.5 - ta) / (3.5 * (6.45 * icl + 0.1))
+
+    p1 = icl * fcl
+    p2 = p1 * 3.96
+    p3 = p1 * 100
+    p4 = p1 * taa
+    p5 = 308.7 - 0.028 * m + p2 * np.power(tra / 100, 4)
+
+    xn = tcla / 100
+    hc = hcf.copy()
+    iterations = np.zeros(ta.size, dtype=np.int64)
+    converged = np.zeros(ta.size, dtype=bool)
+    fallback = np.zeros(ta.size, dtype=bool)
+    active = np.arange(ta.size)
+    if solver == "newton":
+        xn, hc, iterations, converged = _tcl_newton_vec(xn, p2, p3, p4, p5, hcf, taa)
+        fallback = ~converged
+        active = np.flatnonzero(fallback)
+        xn[active] = tcla[active] / 100
+
+    xf = xn.copy()
+    eps = 0.0015
+    for _ in range(500):
+        if active.size == 0:
+            break
+        xf[active] = (xf[active] + xn[active]) / 2
+        hcn = 2.38 * np.power(np.abs(100 * xf[active] - taa[active]), 0.25)
+        hc[active] = np.maximum(hcf[active], hcn)
+        xn_new = (p5[active] + p4[active] * hc[active] - p2[active] * np.power(xf[active], 4)) / (100 + p3[active] * hc[active])
+        done = np.abs(xn_new - xf[active]) <= eps
+        xn[active] = xn_new
+        iterations[active] += 1
+        converged[active[done]] = True
+        active = active[~done]
+
+    _record_solver_stats(
+        solver,
+        ta.size,
+        int(iterations.sum()),
+        int(iterations.max()) if ta.size else 0,
+        int(np.count_nonzero(~converged)),
+        int(np.count_nonzero(fallback)),
+        time.perf_counter() - start,
+    )
+    if info is not None:
+        info.update(
+            solver=solver,
+            iterations=iterations.reshape(shape),
+            converged=converged.reshape(shape),
+            fallback=fallback.reshape(shape),
+        )
+
+    tcl = 100 * xn - 273
+
+    # === F. Heat losses ===
+    hl1 = 3.05 * 0.001 * (5733 - 6.99 * m - pa)
+    hl2 = np.where(m > 58.15, 0.42 * (m - 58.15), 0)
+    hl3 = 1.7 * 0.00001 * m * (5867 - pa)
+    hl4 = 0.0014 * m * (34 - ta)
+    hl5 = 3.96 * fcl * (np.power(xn, 4) - np.power(tra / 100, 4))
+    hl6 = fcl * hc * (tcl - ta)
+
+    ts = 0.303 * np.exp(-0.036 * m) + 0.028
+    pmv = ts * (m - hl1 - hl2 - hl3 - hl4 - hl5 - hl6)
+    ppd = 100 - 95 * np.exp(-0.03353 * np.power(pmv, 4) - 0.2179 * np.power(pmv, 2))
+
+    return pmv.reshape(shape), ppd.reshape(shape)
+
+def get_thermal_comfort_dashboard(ta, rh, clo, met):
+    """PMV / PPD arrays for dashboard inputs (vel 0.15, tr = ta)."""
+    return get_thermal_comfort_vba_vec(ta, rh, 0.15, ta, clo, met)
+
 def get_thermal_comfort_vba(ta, rh, date_val, clo_mode="fourier"): 
     """ 
     VBA-aligned PMV / PPD calculation with automated CLO and defaults.
@@ -219,10 +824,13 @@ def get_thermal_comfort_vba(ta, rh, date_val, clo_mode="fourier"):
     pmv, ppd = get_thermal_comfort_vba_base(ta, rh, vel, tr, clo, met)
     return round(pmv, 9), round(ppd, 2), round(clo, 4) 
 
-def calculate_pmv(ta, tr, vel, rh, met, clo, wme=0):
+def calculate_pmv(ta, tr, vel, rh, met, clo, wme=0, solver=None, info=None):
     """
     Original PMV calculation based on ISO 7730.
+    `solver` and `info` behave as in get_thermal_comfort_vba_base.
     """
+    solver = _check_solver(solver)
+    start = time.perf_counter()
     pa = rh * 10 * math.exp(16.6536 - 4030.183 / (ta + 235))
     icl = 0.155 * clo
     m = met * 58.15
@@ -237,21 +845,35 @@ def calculate_pmv(ta, tr, vel, rh, met, clo, wme=0):
     p3 = p1 * 100
     p4 = p1 * ta
     p5 = 308.7 - 0.028 * mw + p2 * ((tr + 273) / 100) ** 4
-    xn = tcl / 100
-    xf = xn / 50
-    eps = 0.00015
     n = 0
-    while n < 150:
-        xf = (xf + xn) / 2
-        hcn = 2.38 * abs(100 * xf - ta) ** 0.25
-        if hcf > hcn:
-            hc = hcf
-        else:
-            hc = hcn
-        xn = (p5 + p4 * hc - p2 * xf**4) / (100 + p3 * hc)
-        n += 1
-        if abs(xn - xf) < eps:
-            break
+    converged = False
+    fallback = False
+    if solver == "newton":
+        xn, hc, n, converged = _tcl_newton(tcl / 100, p2, p3, p4, p5, hcf, ta)
+        fallback = not converged
+
+    if solver == "fixed_point" or fallback:
+        xn = tcl / 100
+        xf = xn / 50
+        eps = 0.00015
+        n_fixed = 0
+        while n_fixed < 150:
+            xf = (xf + xn) / 2
+            hcn = 2.38 * abs(100 * xf - ta) ** 0.25
+            if hcf > hcn:
+                hc = hcf
+            else:
+                hc = hcn
+            xn = (p5 + p4 * hc - p2 * xf**4) / (100 + p3 * hc)
+            n_fixed += 1
+            if abs(xn - xf) < eps:
+                converged = True
+                break
+        n += n_fixed
+
+    _record_solver_stats(solver, 1, n, n, int(not converged), int(fallback), time.perf_counter() - start)
+    if info is not None:
+        info.update(solver=solver, iterations=n, converged=converged, fallback=fallback)
     tcl = 100 * xn
     hl1 = 3.05 * 0.001 * (5733 - 6.99 * mw - pa)
     hl2 = 0.42 * (mw - 58.15) if mw > 58.15 else 0
@@ -4,27 +4,105 @@ import numpy as np
 import os
 from datetime import datetime
 
+# model_path as given -> file it resolved to, so later constructions skip the search
+_RESOLVED_PATHS = {}
+
+# Keys read eagerly from .npz models; every other array is a training diagnostic loaded on demand
+NPZ_COEFFICIENT_KEYS = ('model_params', 'params')
+
+
+class LazyModelData(dict):
+    """
+    model_data for .npz models. Holds the metadata header and coefficients;
+    diagnostic arrays (y_pred, ...) are read from the file on first access.
+    """
+
+    def __init__(self, path, data, lazy_keys):
+        super().__init__(data)
+        self._path = path
+        self._lazy_keys = set(lazy_keys)
+
+    def _load(self, key):
+        with np.load(self._path) as npz:
+            value = npz[key].tolist()
+        self[key] = value
+        self._lazy_keys.discard(key)
+        return value
+
+    def __getitem__(self, key):
+        if key in self._lazy_keys:
+            return self._load(key)
+        return super().__getitem__(key)
+
+    def get(self, key, default=None):
+        if key in self._lazy_keys:
+            return self._load(key)
+        return super().get(key, default)
+
+    def __contains__(self, key):
+        return key in self._lazy_keys or super().__contains__(key)
+
+    def lazy_keys(self):
+        return sorted(self._lazy_keys)
+
+
+def read_npz_model(path):
+    """Read the metadata header and coefficient block of a .npz model."""
+    with np.load(path) as npz:
+        data = json.loads(str(npz['meta']))
+        for key in NPZ_COEFFICIENT_KEYS:
+            if key in npz.files:
+                data[key] = npz[key].tolist()
+        lazy_keys = [k for k in npz.files if k != 'meta' and k not in NPZ_COEFFICIENT_KEYS]
+    return LazyModelData(path, data, lazy_keys)
+
+
+def convert_json_model(json_path, npz_path=None):
+    """
+    Convert a JSON model to the compact .npz format: a JSON metadata header ('meta'),
+    the coefficient block, and one array per list-valued training artefact.
+    Returns the written path.
+    """
+    npz_path = npz_path or os.path.splitext(json_path)[0] + '.npz'
+    with open(json_path, 'r', encoding='utf-8') as f:
+        model = json.load(f)
+    meta = {k: v for k, v in model.items() if not isinstance(v, list)}
+    arrays = {k: np.asarray(v, dtype=float) for k, v in model.items() if isinstance(v, list)}
+    np.savez(npz_path, meta=np.array(json.dumps(meta, ensure_ascii=False)), **arrays)
+    return npz_path
+
 class CLOPredictor:
     def __init__(self, model_path):
         self.model_path = model_path
         self.model_data = None
+        self._doy_table = None
         self.load_model()
 
     def load_model(self):
+        self._doy_table = None
+        self.is_default = False
         # Try to find the model file in several locations
+        requested = self.model_path
         search_paths = [
+            _RESOLVED_PATHS.get(requested),
             self.model_path,
             os.path.join('models', self.model_path),
             os.path.join('backend', 'models', self.model_path),
             os.path.join(os.path.dirname(__file__), 'models', self.model_path)
         ]
+        # Absolute paths make every join collapse to the same file; probe each candidate once
+        search_paths = list(dict.fromkeys(p for p in search_paths if p))
         
         for path in search_paths:
             if os.path.exists(path):
                 try:
-                    with open(path, 'r', encoding='utf-8') as f:
-                        self.model_data = json.load(f)
+                    if path.endswith('.npz'):
+                        self.model_data = read_npz_model(path)
+                    else:
+                        with open(path, 'r', encoding='utf-8') as f:
+                            self.model_data = json.load(f)
                     self.model_path = path
+                    _RESOLVED_PATHS[requested] = path
                     print(f"Successfully loaded model from {path}")
                     return
                 except Exception as e:
@@ -32,6 +110,7 @@ class CLOPredictor:
 
         # Fallback to default coefficients if file not found
         print(f"Model file not found in search paths. Using defaults.")
+        self.is_default = True
         self.model_data = {
                 "name": "Fourier 4-Harmonic Default",
                 "type": "fourier",
@@ -65,6 +144,60 @@ class CLOPredictor:
             result += params[2*n] * math.sin(n * omega * x)
         return result
 
+    def fourier_series_vec(self, x, params):
+        """fourier_series broadcast over x and the harmonic index (same harmonic count)."""
+        n_harmonics = len(params) // 2 - 1
+        params = np.asarray(params, dtype=float)
+        n = np.arange(1, n_harmonics + 1)
+        angle = (2 * np.pi / 365) * np.multiply.outer(np.asarray(x, dtype=float), n)
+        a = params[1:2 * n_harmonics:2]
+        b = params[2:2 * n_harmonics + 1:2]
+        return params[0] + np.cos(angle) @ a + np.sin(angle) @ b
+
+    def _fourier_params(self):
+        """Series parameters if the loaded model is a Fourier/seasonal model, else None."""
+        if not self.model_data:
+            return None
+        params = self.model_data.get('model_params') or self.model_data.get('params')
+        m_type = self.model_data.get('model_type') or self.model_data.get('type')
+        if params and (m_type == 'seasonal' or m_type == 'fourier' or '傅里叶' in self.model_data.get('model_name', '')):
+            return params
+        return None
+
+    def doy_table(self):
+        """CLO for every 0-based day of year (366 entries), with the same 0.3-1.5 clipping as predict."""
+        if self._doy_table is None:
+            params = self._fourier_params()
+            if params is None:
+                table = np.full(366, 0.5)
+            else:
+                table = np.clip(self.fourier_series_vec(np.arange(366), params), 0.3, 1.5)
+            table.setflags(write=False)
+            self._doy_table = table
+        return self._doy_table
+
+    def predict_many(self, dates):
+        """批量预测：dates 为日期字符串 / date / datetime64 序列，返回 NumPy 数组"""
+        try:
+            days = np.asarray(dates, dtype='datetime64[D]')
+        except ValueError:
+            days = np.array([
+                datetime.strptime(d, '%Y/%m/%d') if isinstance(d, str) and '/' in d else d
+                for d in dates
+            ], dtype='datetime64[D]')
+        x = (days - days.astype('datetime64[Y]')).astype(np.intp)
+        return self.doy_table()[x]
+
+    def predict_range(self, start, end):
+        """预测 [start, end] 闭区间内每一天的 CLO 值"""
+        days = np.arange(
+            np.datetime64(start, 'D'),
+            np.datetime64(end, 'D') + np.timedelta64(1, 'D'),
+            dtype='datetime64[D]',
+        )
+        x = (days - days.astype('datetime64[Y]')).astype(np.intp)
+        return self.doy_table()[x]
+
     def predict(self, date_str):
         """预测指定日期的 CLO 值"""
         if isinstance(date_str, str):
@@ -0,0 +1,26 @@
+import sys
+import os
+
+# Add the parent directory to sys.path to allow importing from backend module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.clo_predictor import CLOPredictor, convert_json_model
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python backend/convert_model.py <model.json> [model.npz]")
+        sys.exit(1)
+
+    json_path = sys.argv[1]
+    npz_path = convert_json_model(json_path, sys.argv[2] if len(sys.argv) > 2 else None)
+    print(f"Wrote {npz_path} ({os.path.getsize(json_path)} -> {os.path.getsize(npz_path)} bytes)")
+
+    # Sanity check: both formats must predict the same curve
+    old = CLOPredictor(json_path).predict_range('2025-01-01', '2025-12-31')
+    new = CLOPredictor(npz_path).predict_range('2025-01-01', '2025-12-31')
+    print(f"Max CLO difference over 2025: {abs(old - new).max():.3g}")
+
+
+if __name__ == "__main__":
+    main()
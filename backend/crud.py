@@ -1,22 +1,52 @@
 from sqlalchemy.orm import Session
 from . import models, schemas
 
-def get_latest_sensor_data(db: Session):
-    return db.query(models.SensorData).order_by(models.SensorData.timestamp.desc()).first()
-
-def create_sensor_data(db: Session, sensor_data: schemas.SensorDataCreate):
-    # If mean_radiant_temperature is not provided, assume it equals temperature
-    tr = sensor_data.mean_radiant_temperature
-    if tr is None:
-        tr = sensor_data.temperature
-        
-    db_item = models.SensorData(
-        temperature=sensor_data.temperature,
-        humidity=sensor_data.humidity,
-        air_velocity=sensor_data.air_velocity,
-        mean_radiant_temperature=tr
+READING_FIELDS = ("temp_num", "rh_num", "tvoc_num", "pm_num", "co2_num")
+
+
+def get_latest_reading(db: Session, dev_id: str | None = None):
+    query = db.query(models.EnvironmentMonitor)
+    if dev_id:
+        query = query.filter(models.EnvironmentMonitor.dev_id == dev_id)
+    return query.order_by(models.EnvironmentMonitor.create_time.desc()).first()
+
+
+def reading_to_row(reading: schemas.EnvironmentReading):
+    """Validated reading -> environment_monitor row (the raw table stores readings as varchar)."""
+    create_time = reading.create_time
+    if create_time.tzinfo is not None:
+        # create_time 是本地时间的 DATETIME 列
+        create_time = create_time.astimezone().replace(tzinfo=None)
+    row = {
+        "create_time": create_time.replace(microsecond=0),
+        "dev_id": reading.dev_id,
+        "product_key": reading.product_key,
+        "project_id": reading.project_id,
+        "space_id": reading.space_id,
+    }
+    for field in READING_FIELDS:
+        value = getattr(reading, field)
+        row[field] = None if value is None else str(value)
+    return row
+
+
+def insert_readings(db: Session, rows):
+    """
+    Multi-row insert (one executemany) of environment_monitor rows.
+    Rows whose (create_time, dev_id) already exists are skipped, so a resent batch is harmless.
+    """
+    if not rows:
+        return 0
+    stmt = (
+        models.EnvironmentMonitor.__table__.insert()
+        .prefix_with("IGNORE", dialect="mysql")
+        .prefix_with("OR IGNORE", dialect="sqlite")
+        .prefix_with("OR IGNORE", dialect="duckdb")
     )
-    db.add(db_item)
+    db.execute(stmt, rows)
     db.commit()
-    db.refresh(db_item)
-    return db_item
+    return len(rows)
+
+
+def create_reading(db: Session, reading: schemas.EnvironmentReading):
+    return insert_readings(db, [reading_to_row(reading)])
@@ -0,0 +1,134 @@
+import os
+import threading
+from collections import namedtuple
+from datetime import datetime
+
+from sqlalchemy import text
+
+# dev_id 编码示例: SJ-A0-C01-14F-00-HL-CGQ-0005
+#   building - block - unit - floor - zone - system - device_type - sensor_no
+# 部分楼层的设备没有 system 段: SJ-A0-C01-06F-00-CGQ-0001
+DeviceCode = namedtuple(
+    "DeviceCode",
+    ["dev_id", "building", "block", "unit", "floor", "zone", "system", "device_type", "sensor_no"],
+)
+
+
+def parse_dev_id(dev_id):
+    """
+    Split a structured dev_id into its parts (system is None for 7-part ids);
+    returns None for ids that don't follow the scheme.
+    """
+    parts = dev_id.split("-") if dev_id else []
+    if len(parts) == 7:
+        parts = parts[:5] + [None] + parts[5:]
+    if len(parts) != 8 or not parts[3].upper().endswith("F"):
+        return None
+    return DeviceCode(dev_id, *parts)
+
+
+def floor_key(dev_id):
+    """Building-level prefix up to the floor, e.g. SJ-A0-C01-14F; None if dev_id can't be parsed."""
+    code = parse_dev_id(dev_id)
+    if code is None:
+        return None
+    return "-".join((code.building, code.block, code.unit, code.floor))
+
+
+# Seconds between refreshes of the device index; 0 disables the background refresh
+DEVICE_REFRESH_INTERVAL = float(os.getenv("DEVICE_REFRESH_INTERVAL", "600"))
+
+
+def normalize_floor(floor):
+    """
+    '6', '6f', '06F' all mean floor 6F. In building-qualified keys only the floor part is
+    normalised, so 'sj-a0-c01-06f' and 'SJ-A0-C01-6F' are both SJ-A0-C01-6F.
+    """
+    floor = floor.strip().upper()
+    prefix, dash, floor = floor.rpartition("-")
+    number = floor[:-1] if floor.endswith("F") else floor
+    return prefix + dash + (number.lstrip("0") or "0") + "F"
+
+
+class DeviceRegistry:
+    """
+    In-memory index of the known dev_ids by floor and zone, rebuilt from
+    SELECT DISTINCT dev_id. Lookups read an immutable snapshot, so a refresh never blocks them.
+    """
+
+    def __init__(self, session_factory, interval=DEVICE_REFRESH_INTERVAL):
+        self.session_factory = session_factory
+        self.interval = interval
+        self._index = None
+        self._refreshed_at = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def loaded(self):
+        return self._index is not None
+
+    def refresh(self, db):
+        rows = db.execute(text("SELECT DISTINCT dev_id FROM environment_monitor")).fetchall()
+        index = {"devices": set(), "floor": {}, "floor_key": {}, "zone": {}, "unparsed": set()}
+        for (dev_id,) in rows:
+            if not dev_id:
+                continue
+            index["devices"].add(dev_id)
+            code = parse_dev_id(dev_id)
+            if code is None:
+                index["unparsed"].add(dev_id)
+                continue
+            index["floor"].setdefault(normalize_floor(code.floor), set()).add(dev_id)
+            index["floor_key"].setdefault(normalize_floor(floor_key(dev_id)), set()).add(dev_id)
+            index["zone"].setdefault(code.zone.upper(), set()).add(dev_id)
+        self._index = index
+        self._refreshed_at = datetime.now()
+        return len(index["devices"])
+
+    def resolve(self, floor=None, zone=None):
+        """Sorted dev_ids on `floor` and in `zone` (either may be None); empty if nothing matches."""
+        index = self._index or {"devices": set(), "floor": {}, "floor_key": {}, "zone": {}}
+        matched = set(index["devices"])
+        if floor:
+            floor = normalize_floor(floor)
+            matched &= index["floor_key" if "-" in floor else "floor"].get(floor, set())
+        if zone:
+            matched &= index["zone"].get(zone.strip().upper(), set())
+        return sorted(matched)
+
+    def info(self):
+        index = self._index or {"devices": set(), "floor": {}, "zone": {}, "unparsed": set()}
+        return {
+            "device_count": len(index["devices"]),
+            "floors": {k: len(v) for k, v in sorted(index["floor"].items())},
+            "zones": {k: len(v) for k, v in sorted(index["zone"].items())},
+            "unparsed": sorted(index["unparsed"]),
+            "refreshed_at": self._refreshed_at.isoformat(timespec="seconds") if self._refreshed_at else None,
+        }
+
+    def run_once(self):
+        db = self.session_factory()
+        try:
+            return self.refresh(db)
+        finally:
+            db.close()
+
+    def start(self):
+        if self.interval <= 0 or (self._thread and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="device-registry", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while True:
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"Device registry refresh failed: {e}")
+            if self._stop.wait(self.interval):
+                return
@@ -0,0 +1,55 @@
+"""
+SQL fragments that differ between the supported backends (MySQL, SQLite, DuckDB).
+Raw queries build their date/hour/number expressions here instead of using MySQL's
+HOUR()/DATE() and implicit varchar casts directly.
+"""
+
+MYSQL = "mysql"
+SQLITE = "sqlite"
+DUCKDB = "duckdb"
+
+
+def dialect_name(db):
+    """Dialect of a Session, Connection or Engine ("mysql", "sqlite", "duckdb", ...)."""
+    bind = db.get_bind() if hasattr(db, "get_bind") else db
+    return bind.dialect.name
+
+
+def hour_sql(dialect, column="create_time"):
+    if dialect == SQLITE:
+        return f"CAST(strftime('%H', {column}) AS INTEGER)"
+    if dialect == DUCKDB:
+        return f"hour({column})"
+    return f"HOUR({column})"
+
+
+def date_sql(dialect, column="create_time"):
+    if dialect == DUCKDB:
+        return f"CAST({column} AS DATE)"
+    # MySQL DATE() and SQLite date() both give the day of a datetime
+    return f"DATE({column})"
+
+
+def number_sql(dialect, column):
+    """
+    Numeric value of a varchar reading column. MySQL converts implicitly, so the column is
+    used as is; DuckDB refuses to compare VARCHAR with numbers and SQLite would compare as text.
+    Unparseable values become NULL (DuckDB) or 0 (SQLite, MySQL) and fail the `> 0` filters.
+    """
+    if dialect == SQLITE:
+        return f"CAST({column} AS REAL)"
+    if dialect == DUCKDB:
+        return f"TRY_CAST({column} AS DOUBLE)"
+    return column
+
+
+def in_list(column, name, values, params):
+    """
+    `column IN (:name_0, :name_1, ...)` with the values added to params.
+    Binding a tuple to one placeholder only works with MySQL drivers.
+    """
+    placeholders = []
+    for i, value in enumerate(values):
+        params[f"{name}_{i}"] = value
+        placeholders.append(f":{name}_{i}")
+    return f"{column} IN ({', '.join(placeholders)})"
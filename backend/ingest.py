@@ -0,0 +1,190 @@
+import os
+import threading
+import time
+from collections import deque
+from datetime import date
+
+from . import crud, result_cache, rollup
+
+# Flush as soon as this many rows are buffered (also the size of one executemany)
+INGEST_FLUSH_ROWS = int(os.getenv("INGEST_FLUSH_ROWS", "1000"))
+# ... or when the oldest buffered row has waited this many seconds
+INGEST_FLUSH_INTERVAL = float(os.getenv("INGEST_FLUSH_INTERVAL", "1.0"))
+# Rows held in memory at most, including batches waiting for a retry; submissions beyond it
+# are refused (the API answers 503)
+INGEST_QUEUE_MAX = int(os.getenv("INGEST_QUEUE_MAX", "100000"))
+# Attempts per batch before its rows are counted as failed and dropped
+INGEST_MAX_ATTEMPTS = int(os.getenv("INGEST_MAX_ATTEMPTS", "5"))
+# Seconds before the first retry of a failed batch; doubles per attempt up to INGEST_RETRY_BACKOFF_MAX
+INGEST_RETRY_BACKOFF = float(os.getenv("INGEST_RETRY_BACKOFF", "1.0"))
+INGEST_RETRY_BACKOFF_MAX = 60.0
+# Window for the sustained inserts-per-second figure
+RATE_WINDOW = 60.0
+
+
+class IngestWriter:
+    """
+    Buffers validated environment_monitor rows and writes them from one background thread
+    in multi-row inserts, flushing on INGEST_FLUSH_ROWS or INGEST_FLUSH_INTERVAL.
+    A batch that fails is kept and retried with exponential backoff (the insert skips rows that
+    already exist, so a retry is safe); only after INGEST_MAX_ATTEMPTS are its rows counted as failed.
+    Backfilled rows (older than the rollup watermark, or on a closed day) get their rollup
+    hours rebuilt and their days dropped from the result cache after the insert.
+    """
+
+    def __init__(self, session_factory, flush_rows=INGEST_FLUSH_ROWS,
+                 flush_interval=INGEST_FLUSH_INTERVAL, queue_max=INGEST_QUEUE_MAX,
+                 max_attempts=INGEST_MAX_ATTEMPTS, retry_backoff=INGEST_RETRY_BACKOFF):
+        self.session_factory = session_factory
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.queue_max = queue_max
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self._buffer = []
+        self._retries = []  # (monotonic time due, attempts so far, batch)
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._stop = False
+        self._thread = None
+        self._recent = deque()  # (monotonic time, rows) per successful insert
+        self.stats = {
+            "inserted": 0, "batches": 0, "retried": 0, "failed": 0, "refused": 0, "backfilled": 0,
+            "last_error": None,
+        }
+
+    @property
+    def retry_depth(self):
+        return sum(len(batch) for _, _, batch in self._retries)
+
+    @property
+    def queue_depth(self):
+        return len(self._buffer) + self.retry_depth
+
+    def submit(self, rows):
+        """Queue rows for writing; returns False (nothing queued) if the buffer is full."""
+        with self._cond:
+            if self.queue_depth + len(rows) > self.queue_max:
+                self.stats["refused"] += len(rows)
+                return False
+            self._buffer.extend(rows)
+            if len(self._buffer) >= self.flush_rows:
+                self._cond.notify()
+        self.start()
+        return True
+
+    def _take(self):
+        with self._cond:
+            batch = self._buffer[:self.flush_rows]
+            del self._buffer[:self.flush_rows]
+            return batch
+
+    def _take_retries(self, final):
+        with self._cond:
+            now = time.monotonic()
+            due = [entry for entry in self._retries if final or entry[0] <= now]
+            self._retries = [entry for entry in self._retries if not (final or entry[0] <= now)]
+        return [(attempts, batch) for _, attempts, batch in due]
+
+    def flush(self, final=False):
+        """
+        Write everything buffered so far, after the failed batches whose backoff has passed
+        (all of them, for one last attempt, when `final`); returns the number of rows inserted.
+        """
+        written = 0
+        with self._flush_lock:
+            for attempts, batch in self._take_retries(final):
+                written += self._write(batch, attempts, final)
+            while True:
+                batch = self._take()
+                if not batch:
+                    return written
+                written += self._write(batch, 0, final)
+
+    def _write(self, batch, attempts, final):
+        db = self.session_factory()
+        try:
+            crud.insert_readings(db, batch)
+            self._backfill(db, batch)
+        except Exception as e:
+            db.rollback()
+            attempts += 1
+            self.stats["last_error"] = str(e)
+            if final or attempts >= self.max_attempts:
+                self.stats["failed"] += len(batch)
+                print(f"Ingest flush of {len(batch)} rows failed after {attempts} attempts, dropping it: {e}")
+            else:
+                delay = min(self.retry_backoff * 2 ** (attempts - 1), INGEST_RETRY_BACKOFF_MAX)
+                with self._cond:
+                    self._retries.append((time.monotonic() + delay, attempts, batch))
+                self.stats["retried"] += len(batch)
+                print(f"Ingest flush of {len(batch)} rows failed (attempt {attempts}), retrying in {delay:.1f}s: {e}")
+            return 0
+        finally:
+            db.close()
+        self.stats["inserted"] += len(batch)
+        self.stats["batches"] += 1
+        self._recent.append((time.monotonic(), len(batch)))
+        return len(batch)
+
+    def _backfill(self, db, batch):
+        """Bring rows the dashboards have already moved past into the rollup and the result cache."""
+        today = date.today()
+        closed_days = {row["create_time"].date() for row in batch if row["create_time"].date() < today}
+        try:
+            # Read after the insert committed: the rollup job may have closed more hours meanwhile
+            watermark = rollup.get_watermark(db)
+        except Exception:
+            # rollup tables missing (e.g. no CREATE permission): nothing to rebuild
+            db.rollback()
+            watermark = None
+        if watermark is not None:
+            stale = [row["create_time"] for row in batch if row["create_time"] < watermark]
+            if stale:
+                rollup.refresh_hours(db, {rollup.floor_hour(t) for t in stale})
+                self.stats["backfilled"] += len(stale)
+        if closed_days:
+            result_cache.result_cache.invalidate_days(closed_days)
+
+    def rows_per_second(self):
+        now = time.monotonic()
+        while self._recent and now - self._recent[0][0] > RATE_WINDOW:
+            self._recent.popleft()
+        if not self._recent:
+            return 0.0
+        span = max(now - self._recent[0][0], self.flush_interval)
+        return sum(n for _, n in self._recent) / span
+
+    def info(self):
+        return dict(
+            self.stats,
+            queue_depth=self.queue_depth,
+            retry_depth=self.retry_depth,
+            queue_max=self.queue_max,
+            rows_per_second=round(self.rows_per_second(), 1),
+        )
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        with self._cond:
+            self._stop = False
+        self._thread = threading.Thread(target=self._run, name="ingest-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=10.0):
+        """Stop the writer thread and write whatever is still buffered, retries included."""
+        with self._cond:
+            self._stop = True
+            self._cond.notify()
+        if self._thread:
+            self._thread.join(timeout)
+        self.flush(final=True)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._stop or len(self._buffer) >= self.flush_rows, self.flush_interval)
+                if self._stop:
+                    return
+            self.flush()
@@ -0,0 +1,192 @@
+import asyncio
+import json
+import os
+import threading
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import text
+
+from . import aggregation, calc, devices, dialects
+
+# Seconds between polls for new readings while at least one client is subscribed
+LIVE_POLL_INTERVAL = float(os.getenv("LIVE_POLL_INTERVAL", "10"))
+# Upper bound on readings fetched per poll; the rest follow on the next one
+LIVE_MAX_ROWS = int(os.getenv("LIVE_MAX_ROWS", "5000"))
+# Events buffered per client; a client that falls further behind loses its oldest events
+LIVE_QUEUE_SIZE = int(os.getenv("LIVE_QUEUE_SIZE", "100"))
+# Seconds without events after which an SSE comment is sent so proxies keep the connection open
+LIVE_KEEPALIVE = 15
+
+
+def _number(value):
+    """Reading column -> float, None for empty or unparseable values (like EnvironmentMonitor.temperature)."""
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+class Subscription:
+    def __init__(self, loop, dev_ids=None):
+        self.loop = loop
+        self.dev_ids = set(dev_ids) if dev_ids else None
+        self.queue = asyncio.Queue(maxsize=LIVE_QUEUE_SIZE)
+
+    def _put(self, event):
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+    def publish(self, readings, watermark):
+        if self.dev_ids is not None:
+            readings = [r for r in readings if r["dev_id"] in self.dev_ids]
+            if not readings:
+                return
+        event = json.dumps({"watermark": watermark, "readings": readings}, ensure_ascii=False)
+        self.loop.call_soon_threadsafe(self._put, event)
+
+
+class LivePoller:
+    """
+    One background poller for every live client: reads the environment_monitor rows after
+    its last (create_time, dev_id), computes PMV/PPD for them in one vectorized pass and fans the
+    result out to the subscribers. Database load doesn't depend on the number of open screens.
+    """
+
+    def __init__(self, session_factory, interval=LIVE_POLL_INTERVAL):
+        self.session_factory = session_factory
+        self.interval = interval
+        # Last (create_time, dev_id) seen; the key is unique, so rows sharing a timestamp
+        # across a LIMIT boundary are picked up by the next poll instead of skipped
+        self.cursor = None
+        self.watermark = None
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.stats = {"polls": 0, "readings": 0, "events": 0}
+
+    def subscribe(self, dev_ids=None):
+        subscription = Subscription(asyncio.get_running_loop(), dev_ids)
+        with self._lock:
+            self._subscribers.add(subscription)
+        self.start()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+            if not self._subscribers:
+                # Nobody listening: start from "now" again instead of replaying the gap
+                self.cursor = None
+                self.watermark = None
+
+    @property
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+    def poll(self, db):
+        """Fetch readings after the cursor; returns (readings, watermark)."""
+        if self.cursor is None:
+            latest = db.execute(text(
+                "SELECT create_time, dev_id FROM environment_monitor ORDER BY create_time DESC, dev_id DESC LIMIT 1"
+            )).first()
+            if latest is None:
+                self.cursor = (datetime(1970, 1, 1), "")
+            else:
+                self.cursor = (aggregation.watermark_time(latest.create_time), latest.dev_id)
+            self.watermark = aggregation.format_watermark(self.cursor[0])
+            return [], self.watermark
+
+        dialect = dialects.dialect_name(db)
+        rows = db.execute(text(f"""
+            SELECT create_time, dev_id, temp_num, rh_num
+            FROM environment_monitor
+            WHERE (create_time > :since OR (create_time = :since AND dev_id > :since_dev_id))
+              AND {dialects.number_sql(dialect, "temp_num")} > 0
+              AND {dialects.number_sql(dialect, "rh_num")} > 0
+            ORDER BY create_time, dev_id
+            LIMIT :limit
+        """).bindparams(aggregation.SINCE_PARAM), {
+            "since": self.cursor[0],
+            "since_dev_id": self.cursor[1],
+            "limit": LIVE_MAX_ROWS,
+        }).fetchall()
+        self.stats["polls"] += 1
+        if not rows:
+            return [], self.watermark
+
+        last = rows[-1]
+        self.cursor = (aggregation.watermark_time(last.create_time), last.dev_id)
+        self.watermark = aggregation.format_watermark(self.cursor[0])
+        # The SQL filter lets through values such as '22abc' on MySQL; drop those rows here
+        parsed = [(row, _number(row.temp_num), _number(row.rh_num)) for row in rows]
+        parsed = [(row, ta, rh) for row, ta, rh in parsed if ta is not None and rh is not None]
+        if not parsed:
+            return [], self.watermark
+
+        times = [aggregation.watermark_time(row.create_time) for row, _, _ in parsed]
+        dev_ids = np.array([row.dev_id for row, _, _ in parsed], dtype=object)
+        temps = np.array([ta for _, ta, _ in parsed])
+        rhs = np.array([rh for _, _, rh in parsed])
+        days = np.array([t.date() for t in times], dtype="datetime64[D]")
+
+        # Each device's own CLO model, then one PMV pass for all new readings (met 1.0 as in the export)
+        clos = np.empty(len(parsed))
+        for dev_id in set(dev_ids):
+            mask = dev_ids == dev_id
+            clos[mask] = calc.clo_for_dates("fourier", days[mask], dev_ids=[dev_id])
+        with calc.solver_telemetry("live"):
+            pmvs, ppds = calc.get_thermal_comfort_dashboard(ta=temps, rh=rhs, clo=clos, met=1.0)
+
+        readings = [
+            {
+                "dev_id": dev_id,
+                "floor": devices.floor_key(dev_id),
+                "time": aggregation.format_watermark(time_value),
+                "temp": round(float(ta), 2),
+                "rh": round(float(rh), 1),
+                "clo": round(float(clo), 3),
+                "pmv": round(float(pmv), 2),
+                "ppd": round(float(ppd), 1),
+            }
+            for dev_id, time_value, ta, rh, clo, pmv, ppd in zip(dev_ids, times, temps, rhs, clos, pmvs, ppds)
+        ]
+        self.stats["readings"] += len(readings)
+        return readings, self.watermark
+
+    def run_once(self):
+        if not self._subscribers:
+            return 0
+        db = self.session_factory()
+        try:
+            readings, watermark = self.poll(db)
+        finally:
+            db.close()
+        if readings:
+            with self._lock:
+                subscribers = list(self._subscribers)
+            for subscription in subscribers:
+                subscription.publish(readings, watermark)
+            self.stats["events"] += len(subscribers)
+        return len(readings)
+
+    def start(self):
+        if self.interval <= 0 or (self._thread and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="live-poller", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while True:
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"Live poll failed: {e}")
+            if self._stop.wait(self.interval):
+                return
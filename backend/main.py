@@ -1,18 +1,50 @@
-from fastapi import FastAPI, Depends, HTTPException, Query
-from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
-from sqlalchemy import text
-from datetime import date, timedelta, datetime
+import time
 
-from . import models, database, schemas, calc
+# Module import (FastAPI, SQLAlchemy, numpy, backend modules) is the first timed startup phase
+_import_started = time.perf_counter()
 
-try:
-    models.Base.metadata.create_all(bind=database.engine)
-except Exception as e:
-    print(f"Skipping table creation (likely due to permissions): {e}")
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from pydantic import ValidationError
+from datetime import date, datetime, timedelta
+import numpy as np
+import asyncio
+import csv
+import io
+import json
+import os
+
+from . import models, database, schemas, calc, aggregation, rollup, result_cache, devices, live, ingest, crud, startup
 
 app = FastAPI()
 
+startup_report = startup.StartupReport(origin=_import_started)
+
+# Jobs that write to the database (the hourly rollup) run in one worker: "auto" lets the first
+# worker to take a lock file run them, "1" / "0" turn them on / off for this process
+BACKGROUND_JOBS = os.getenv("BACKGROUND_JOBS", "auto").lower()
+_models_dir = os.path.join(os.path.dirname(__file__), "models")
+jobs_lock = startup.FileLock(os.path.join(_models_dir, ".jobs.lock"))
+# Startup fits run one worker at a time; the first persists them and the others load the result
+fit_lock = startup.FileLock(os.path.join(_models_dir, ".fit.lock"))
+
+rollup_job = rollup.RollupJob(database.SessionLocal)
+device_registry = devices.DeviceRegistry(database.SessionLocal)
+live_poller = live.LivePoller(database.SessionLocal)
+ingest_writer = ingest.IngestWriter(database.SessionLocal)
+
+# Upper bound on the number of rows accepted by /api/calculate-pmv/batch
+PMV_BATCH_MAX = int(os.getenv("PMV_BATCH_MAX", "5000"))
+PMV_FIELDS = ("ta", "rh", "vel", "tr", "clo", "met")
+# Upper bound on the number of readings accepted by one /api/ingest request
+INGEST_BATCH_MAX = int(os.getenv("INGEST_BATCH_MAX", "10000"))
+# Hourly cells fetched and converted per step of /api/export-data/stream
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "2000"))
+EXPORT_MEDIA_TYPES = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson"}
+COLUMNAR_MEDIA_TYPES = {"arrow": "application/vnd.apache.arrow.stream", "parquet": "application/vnd.apache.parquet"}
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -22,315 +54,486 @@ app.add_middleware(
 )
 
 
-def get_db():
-    db = database.SessionLocal()
+def create_tables():
+    database.check_connection()
     try:
-        yield db
-    finally:
-        db.close()
+        models.Base.metadata.create_all(bind=database.get_engine())
+    except Exception as e:
+        print(f"Skipping table creation (likely due to permissions): {e}")
+
+
+def warm_clo_model():
+    # Loads the predictor and builds the per-day CLO tables every dashboard request reads
+    calc.get_clo_tables()
+
+
+def runs_background_jobs():
+    if BACKGROUND_JOBS in ("1", "true", "yes"):
+        return True
+    if BACKGROUND_JOBS in ("0", "false", "no"):
+        return False
+    return jobs_lock.acquire(blocking=False)
+
+
+def start_background_jobs():
+    # Every worker watches the model file and keeps its own device index for floor / zone filters
+    calc.model_registry.start()
+    device_registry.start()
+    if runs_background_jobs():
+        rollup_job.start()
+    else:
+        print("Hourly rollup runs in another worker")
+
+
+def fit_models():
+    with fit_lock:
+        # Pick up a fit another worker persisted while this one waited for the lock
+        calc.load_fourier_cache(database_url=database.SQLALCHEMY_DATABASE_URL)
+        database.run_in_session(calc.fit_models)
 
 
 @app.on_event("startup")
 def startup_event():
-    db = database.SessionLocal()
-    try:
-        print("Performing initial Fourier CLO fitting...")
-        calc.fit_fourier_coefficients(db)
-    finally:
-        db.close()
-
-@app.get("/api/export-data")
-def export_data(
-    start_date: str | None = None,
-    end_date: str | None = None,
-    city: str | None = "beijing",
-    dev_ids: list[str] | None = Query(None),
-    db: Session = Depends(get_db),
-):
+    startup_report.record("import", time.perf_counter() - _import_started)
+    # Serve with the persisted coefficients right away. Nothing on this path touches the
+    # database or loads the model; that happens in the background (or on first use).
+    startup_report.run("fourier_cache", lambda: calc.load_fourier_cache(database_url=database.SQLALCHEMY_DATABASE_URL))
+    # The jobs need the tables, so they start after create_tables in the same thread
+    startup_report.run_in_background([
+        ("clo_model", warm_clo_model),
+        ("database", create_tables),
+        ("background_jobs", start_background_jobs),
+        ("model_fit", fit_models),
+    ])
+
+
+@app.on_event("shutdown")
+def shutdown_event():
+    # Don't lose readings that are still buffered
+    ingest_writer.stop()
+
+
+def parse_date_range(start_date, end_date, default_days):
     if start_date and end_date:
         try:
-            start_obj = date.fromisoformat(start_date)
-            end_obj = date.fromisoformat(end_date)
+            return date.fromisoformat(start_date), date.fromisoformat(end_date)
         except ValueError:
             raise HTTPException(status_code=400, detail="Invalid date format, expected YYYY-MM-DD")
-    else:
-        end_obj = date.today()
-        start_obj = end_obj - timedelta(days=90)
-
-    start_str = start_obj.isoformat()
-    end_str = (end_obj + timedelta(days=1)).isoformat()
-
-    # Base WHERE conditions
-    where_conditions = [
-        "create_time >= :start_date",
-        "create_time < :end_date",
-        "HOUR(create_time) BETWEEN 9 AND 18",
-        "temp_num > 0",
-        "rh_num > 0"
-    ]
-    query_params = {"start_date": start_str, "end_date": end_str}
-
-    if dev_ids and len(dev_ids) > 0:
-        where_conditions.append("dev_id IN :dev_ids")
-        query_params["dev_ids"] = tuple(dev_ids)
-
-    where_clause = " AND ".join(where_conditions)
-
-    # Aggregate data to hourly averages (9:00 - 18:00)
-    sql_query = text(f"""
-        SELECT 
-            DATE(create_time) AS day,
-            HOUR(create_time) AS hour,
-            AVG(temp_num) AS avg_temp,
-            AVG(rh_num) AS avg_rh
-        FROM environment_monitor
-        WHERE {where_clause}
-        GROUP BY day, hour
-        ORDER BY day, hour
-    """)
+    end_obj = date.today()
+    return end_obj - timedelta(days=default_days), end_obj
+
 
+async def resolve_dev_ids(dev_ids, floor, zone):
+    """
+    Device set for a request: explicit dev_ids, narrowed to floor= / zone= through the device
+    registry. Returns dev_ids unchanged (None = all devices) when neither filter is given.
+    """
+    if not floor and not zone:
+        return dev_ids
     try:
-        results = db.execute(sql_query, query_params).fetchall()
+        if not device_registry.loaded:
+            await database.run_db(device_registry.refresh)
     except Exception as e:
-        print(f"Export query failed: {e}")
+        print(f"Device registry refresh failed: {e}")
         raise HTTPException(status_code=500, detail=f"Database query failed: {str(e)}")
 
-    export_list = []
-    for row in results:
-        day_val = row.day
-        hour_val = row.hour
-        # Ensure day_val is a datetime/date object for calculation
-        if isinstance(day_val, str):
-            date_obj = datetime.strptime(day_val, "%Y-%m-%d")
-        else:
-            # If it's a date object, convert to datetime for get_thermal_comfort_vba
-            date_obj = datetime.combine(day_val, datetime.min.time())
-        
-        ta = float(row.avg_temp)
-        rh = float(row.avg_rh)
-        
-        # Calculate PMV/CLO based on the day
-        pmv_val, _, clo_val = calc.get_thermal_comfort_vba(
-            ta=ta,
-            rh=rh,
-            date_val=date_obj,
-            clo_mode="fourier"
+    matched = device_registry.resolve(floor, zone)
+    if dev_ids:
+        requested = set(dev_ids)
+        matched = [dev_id for dev_id in matched if dev_id in requested]
+    if not matched:
+        raise HTTPException(status_code=404, detail=f"No devices match floor={floor} zone={zone}")
+    return matched
+
+
+async def fetch_aggregates(start_obj, end_obj, dev_ids, label):
+    try:
+        return await database.run_db(aggregation.aggregation_service.get, start_obj, end_obj, dev_ids)
+    except Exception as e:
+        print(f"{label} query failed: {e}")
+        raise HTTPException(status_code=500, detail=f"Database query failed: {str(e)}")
+
+
+def cache_prefix(endpoint, dev_ids, *params):
+    """Result cache key for everything except the day: endpoint, filters and the CLO model state."""
+    return (endpoint, aggregation.AggregationService._dev_key(dev_ids), params, calc.clo_state_token())
+
+
+async def cached_rows(prefix, start_obj, end_obj, dev_ids, label, build_rows):
+    """
+    Per-day cached rows; for missing days the aggregates are fetched on the DB executor and
+    build_rows(aggregates) runs on the threadpool, after the session has been released.
+    """
+    async def compute(first_day, last_day):
+        aggregates = await fetch_aggregates(first_day, last_day, dev_ids, label)
+        return await run_in_threadpool(build_rows, aggregates)
+
+    return await result_cache.result_cache.get_or_compute_async(prefix, start_obj, end_obj, compute)
+
+
+def parse_since(since):
+    try:
+        value = datetime.fromisoformat(since)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid since, expected an ISO timestamp such as 2025-10-01 14:00:00")
+    if value.tzinfo is not None:
+        # create_time 是本地时间的 DATETIME 列
+        value = value.astimezone().replace(tzinfo=None)
+    return value.isoformat(sep=" ")
+
+
+async def fetch_watermark(start_obj, end_obj, dev_ids, label):
+    try:
+        return await database.run_db(aggregation.latest_reading, start_obj, end_obj, dev_ids)
+    except Exception as e:
+        print(f"{label} query failed: {e}")
+        raise HTTPException(status_code=500, detail=f"Database query failed: {str(e)}")
+
+
+async def watermarked_rows(prefix, start_obj, end_obj, dev_ids, label, build_rows):
+    """
+    Full load for the endpoints that return a watermark: (rows in day order, watermark).
+    Days from today on are still receiving readings, so they are rebuilt from the database after
+    the watermark is taken, bypassing the aggregate and result caches: every reading up to the
+    watermark is in the rows, and the next since=<watermark> delta only has to add newer ones.
+    Closed days come from the result cache.
+    """
+    watermark = await fetch_watermark(start_obj, end_obj, dev_ids, label)
+    today = date.today()
+    rows = []
+    if start_obj < today:
+        rows = await cached_rows(prefix, start_obj, min(end_obj, today - timedelta(days=1)), dev_ids, label, build_rows)
+    if end_obj >= today:
+        first_open = max(start_obj, today)
+        try:
+            aggregates = await database.run_db(aggregation.query_hourly, first_open, end_obj, dev_ids)
+        except Exception as e:
+            print(f"{label} query failed: {e}")
+            raise HTTPException(status_code=500, detail=f"Database query failed: {str(e)}")
+        grouped = await run_in_threadpool(build_rows, aggregates)
+        for i in range((end_obj - first_open).days + 1):
+            day = first_open + timedelta(days=i)
+            day_rows = grouped.get(day.isoformat(), [])
+            result_cache.result_cache.store(prefix, day, day_rows)
+            rows.extend(day_rows)
+    return rows, watermark
+
+
+async def changed_rows(prefix, start_obj, end_obj, dev_ids, since, label, build_rows):
+    """
+    Delta refresh: rebuilds only the days that have readings after `since`.
+    Returns ({day: rows} for those days, set of changed (day, hour) cells, new watermark);
+    the rebuilt days also replace their entries in the result cache.
+    """
+    try:
+        cells, watermark = await database.run_db(aggregation.query_changes, start_obj, end_obj, dev_ids, since)
+        if not cells:
+            return {}, set(), watermark
+        changed_days = sorted({date.fromisoformat(day_str) for day_str, _ in cells})
+        aggregates = await database.run_db(aggregation.query_hourly, changed_days[0], changed_days[-1], dev_ids)
+    except Exception as e:
+        print(f"{label} query failed: {e}")
+        raise HTTPException(status_code=500, detail=f"Database query failed: {str(e)}")
+
+    grouped = await run_in_threadpool(build_rows, aggregates)
+    rows = {}
+    for day in changed_days:
+        rows[day.isoformat()] = grouped.get(day.isoformat(), [])
+        result_cache.result_cache.store(prefix, day, rows[day.isoformat()])
+    return rows, set(cells), watermark
+
+
+def group_by_day(days, items):
+    grouped = {}
+    for day_str, item in zip(days, items):
+        grouped.setdefault(day_str, []).append(item)
+    return grouped
+
+
+EXPORT_COLUMNS = ("日期", "时间", "温度", "湿度", "clo值", "pmv值")
+
+
+def export_records(aggregates, dev_ids, label="export-data"):
+    """Export rows for hourly aggregates; returns (day strings, rows) in the same order."""
+    days, hours, temps, rhs = aggregates.hourly()
+    # CLO based on the day (same "fourier" mode as get_thermal_comfort_vba)
+    clos = calc.clo_for_dates("fourier", days, dev_ids=dev_ids)
+
+    # Calculate PMV for the whole result set in one pass (VBA defaults: vel 0.15, tr = ta, met 1.0)
+    with calc.solver_telemetry(label):
+        pmvs, _ = calc.get_thermal_comfort_vba_vec(
+            ta=temps,
+            rh=rhs,
+            vel=0.15,
+            tr=temps,
+            clo=clos,
+            met=1.0
         )
-        
+
+    export_list = []
+    for day_str, hour_val, ta, rh, clo_val, pmv_val in zip(days, hours, temps, rhs, clos, pmvs):
         export_list.append({
-            "日期": day_val.strftime("%Y-%m-%d") if not isinstance(day_val, str) else day_val,
-            "时间": f"{hour_val:02d}:00",
-            "温度": round(ta, 2),
-            "湿度": round(rh, 1),
-            "clo值": round(clo_val, 3),
-            "pmv值": round(pmv_val, 3)
+            "日期": day_str,
+            "时间": f"{int(hour_val):02d}:00",
+            "温度": round(float(ta), 2),
+            "湿度": round(float(rh), 1),
+            "clo值": round(round(float(clo_val), 4), 3),
+            "pmv值": round(round(float(pmv_val), 9), 3)
         })
+    return days, export_list
+
+
+def columnar_export(aggregates, fmt):
+    """
+    Per-device hourly export as Arrow IPC stream or Parquet bytes, built straight from the
+    aggregate arrays. pyarrow is optional and only imported when this format is requested.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise HTTPException(status_code=501, detail="Arrow/Parquet export requires pyarrow (pip install pyarrow)")
+
+    temps = aggregates.sum_temp / aggregates.counts
+    rhs = aggregates.sum_rh / aggregates.counts
+    device_names, device_idx = np.unique(aggregates.devices.astype(str), return_inverse=True)
+
+    # Each device gets the CLO curve of its own fitted model (or its floor's / the global one)
+    clos = np.empty(len(aggregates))
+    for i, dev_id in enumerate(device_names):
+        mask = device_idx == i
+        clos[mask] = calc.clo_for_dates("fourier", aggregates.days[mask], dev_ids=[dev_id])
+
+    with calc.solver_telemetry("export-columnar"):
+        pmvs, ppds = calc.get_thermal_comfort_vba_vec(
+            ta=temps,
+            rh=rhs,
+            vel=0.15,
+            tr=temps,
+            clo=clos,
+            met=1.0
+        )
+
+    table = pa.table({
+        "date": pa.array(aggregates.days, type=pa.date32()),
+        "hour": pa.array(aggregates.hours.astype(np.int8)),
+        "dev_id": pa.DictionaryArray.from_arrays(device_idx.astype(np.int32), device_names.tolist()),
+        "temp": temps,
+        "rh": rhs,
+        "clo": clos,
+        "pmv": np.asarray(pmvs, dtype=float),
+        "ppd": np.asarray(ppds, dtype=float),
+    })
+    sink = pa.BufferOutputStream()
+    if fmt == "parquet":
+        pq.write_table(table, sink)
+    else:
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+@app.get("/api/export-data")
+async def export_data(
+    start_date: str | None = None,
+    end_date: str | None = None,
+    city: str | None = "beijing",
+    dev_ids: list[str] | None = Query(None),
+    floor: str | None = None,
+    zone: str | None = None,
+    format: str = "json",
+):
+    if format != "json" and format not in COLUMNAR_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"Unsupported export format '{format}', expected json, arrow or parquet")
+    start_obj, end_obj = parse_date_range(start_date, end_date, 90)
+    dev_ids = await resolve_dev_ids(dev_ids, floor, zone)
 
+    if format in COLUMNAR_MEDIA_TYPES:
+        try:
+            aggregates = await database.run_db(aggregation.query_hourly, start_obj, end_obj, dev_ids, True)
+        except Exception as e:
+            print(f"Export query failed: {e}")
+            raise HTTPException(status_code=500, detail=f"Database query failed: {str(e)}")
+        body = await run_in_threadpool(columnar_export, aggregates, format)
+        filename = f"pmv_export_{start_obj.isoformat()}_{end_obj.isoformat()}.{format}"
+        return Response(
+            content=body,
+            media_type=COLUMNAR_MEDIA_TYPES[format],
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+        )
+
+    def build_rows(aggregates):
+        # Hourly averages (9:00 - 18:00)
+        return group_by_day(*export_records(aggregates, dev_ids))
+
+    export_list = await cached_rows(
+        cache_prefix("export-data", dev_ids),
+        start_obj, end_obj, dev_ids, "Export", build_rows
+    )
     return {"data": export_list}
 
 
+def stream_export(start_obj, end_obj, dev_ids, fmt):
+    """
+    Yields the export as CSV or NDJSON text, one chunk per EXPORT_CHUNK_ROWS hourly cells.
+    Rows come from a server-side cursor, so memory stays flat however long the range is.
+    """
+    db = database.SessionLocal()
+    try:
+        if fmt == "csv":
+            # BOM so Excel detects UTF-8 for the Chinese headers
+            yield "\ufeff" + ",".join(EXPORT_COLUMNS) + "\n"
+        for chunk in aggregation.iter_hourly(db, start_obj, end_obj, dev_ids, EXPORT_CHUNK_ROWS):
+            _, rows = export_records(chunk, dev_ids, "export-stream")
+            buffer = io.StringIO()
+            if fmt == "csv":
+                writer = csv.writer(buffer, lineterminator="\n")
+                writer.writerows([row[c] for c in EXPORT_COLUMNS] for row in rows)
+            else:
+                for row in rows:
+                    buffer.write(json.dumps(row, ensure_ascii=False) + "\n")
+            yield buffer.getvalue()
+    except Exception as e:
+        # Headers are already sent; the truncated body is all the client will see
+        print(f"Export stream failed: {e}")
+        raise
+    finally:
+        db.close()
+
+
+@app.get("/api/export-data/stream")
+async def export_data_stream(
+    start_date: str | None = None,
+    end_date: str | None = None,
+    format: str = "csv",
+    dev_ids: list[str] | None = Query(None),
+    floor: str | None = None,
+    zone: str | None = None,
+):
+    if format not in EXPORT_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"Unsupported export format '{format}', expected csv or ndjson")
+    start_obj, end_obj = parse_date_range(start_date, end_date, 90)
+    dev_ids = await resolve_dev_ids(dev_ids, floor, zone)
+
+    filename = f"pmv_export_{start_obj.isoformat()}_{end_obj.isoformat()}.{format}"
+    return StreamingResponse(
+        stream_export(start_obj, end_obj, dev_ids, format),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
 @app.get("/api/pmv-heatmap")
-def get_pmv_heatmap(
+async def get_pmv_heatmap(
     start_date: str | None = None,
     end_date: str | None = None,
     city: str | None = "beijing",
     dev_ids: list[str] | None = Query(None),
+    floor: str | None = None,
+    zone: str | None = None,
     clo_strategy: str = "fourier",
     manual_clo: float = 0.5,
     metabolic_rate: float = 1.0,
-    db: Session = Depends(get_db),
 ):
-    if start_date and end_date:
-        try:
-            start_obj = date.fromisoformat(start_date)
-            end_obj = date.fromisoformat(end_date)
-        except ValueError:
-            raise HTTPException(status_code=400, detail="Invalid date format, expected YYYY-MM-DD")
-    else:
-        end_obj = date.today()
-        start_obj = end_obj - timedelta(days=90)
-
-    start_str = start_obj.isoformat()
-    end_str = (end_obj + timedelta(days=1)).isoformat()
-
-    # Base WHERE conditions
-    where_conditions = [
-        "create_time >= :start_date",
-        "create_time < :end_date",
-        "HOUR(create_time) BETWEEN 9 AND 18",
-        "temp_num > 0",
-        "rh_num > 0"
-    ]
-    query_params = {"start_date": start_str, "end_date": end_str}
-
-    if dev_ids and len(dev_ids) > 0:
-        where_conditions.append("dev_id IN :dev_ids")
-        query_params["dev_ids"] = tuple(dev_ids)
-
-    where_clause = " AND ".join(where_conditions)
-
-    sql_query = text(f"""
-        SELECT 
-            DATE(create_time) AS day,
-            AVG(temp_num) AS avg_temp,
-            AVG(rh_num) AS avg_rh
-        FROM environment_monitor
-        WHERE {where_clause}
-        GROUP BY day
-        ORDER BY day
-    """)
-
-    try:
-        results = db.execute(sql_query, query_params).fetchall()
-    except Exception as e:
-        print(f"Calendar query failed: {e}")
-        raise HTTPException(status_code=500, detail=f"Database query failed: {str(e)}")
+    start_obj, end_obj = parse_date_range(start_date, end_date, 90)
+    dev_ids = await resolve_dev_ids(dev_ids, floor, zone)
+
+    def build_rows(aggregates):
+        days, temps, rhs = aggregates.daily()
+        clos = calc.clo_for_dates(clo_strategy, days, manual_clo, dev_ids)
+
+        with calc.solver_telemetry("pmv-heatmap"):
+            pmvs, _ = calc.get_thermal_comfort_dashboard(
+                ta=temps,
+                rh=rhs,
+                clo=clos,
+                met=metabolic_rate
+            )
 
-    heatmap_data = []
-    for row in results:
-        day_str = str(row.day)
-        temp_val = float(row.avg_temp)
-        rh_val = float(row.avg_rh)
-        
-        date_obj = datetime.strptime(day_str, "%Y-%m-%d")
-        
-        # Determine CLO based on strategy
-        if clo_strategy == "manual":
-            clo_val = manual_clo
-        elif clo_strategy == "month":
-            clo_val = calc.clo_by_month(date_obj)
-        elif clo_strategy == "fixed_summer":
-            clo_val = 0.5
-        elif clo_strategy == "fixed_winter":
-            clo_val = 1.0
-        else:
-            clo_val = calc.clo_fourier_4(date_obj)
-            
-        pmv_val, _ = calc.get_thermal_comfort_vba_base(
-            ta=temp_val,
-            rh=rh_val,
-            vel=0.15,
-            tr=temp_val,
-            clo=clo_val,
-            met=metabolic_rate
-        )
-        
-        heatmap_data.append({
-            "day": day_str,
-            "pmv": round(pmv_val, 2)
-        })
+        return group_by_day(days, [
+            {"day": day_str, "pmv": round(float(pmv_val), 2)}
+            for day_str, pmv_val in zip(days, pmvs)
+        ])
 
+    heatmap_data = await cached_rows(
+        cache_prefix("pmv-heatmap", dev_ids, clo_strategy, manual_clo, metabolic_rate),
+        start_obj, end_obj, dev_ids, "Calendar", build_rows
+    )
     return {"data": heatmap_data}
 
 
 @app.get("/api/pmv-hourly-heatmap")
-def get_pmv_hourly_heatmap(
+async def get_pmv_hourly_heatmap(
     start_date: str | None = None,
     end_date: str | None = None,
     city: str | None = "beijing",
     dev_ids: list[str] | None = Query(None),
+    floor: str | None = None,
+    zone: str | None = None,
     clo_strategy: str = "fourier",
     manual_clo: float = 0.5,
     metabolic_rate: float = 1.0,
-    db: Session = Depends(get_db),
+    since: str | None = None,
 ):
-    if start_date and end_date:
-        try:
-            start_obj = date.fromisoformat(start_date)
-            end_obj = date.fromisoformat(end_date)
-        except ValueError:
-            raise HTTPException(status_code=400, detail="Invalid date format, expected YYYY-MM-DD")
-    else:
-        end_obj = date.today()
-        start_obj = end_obj - timedelta(days=30) # Hourly view defaults to shorter range
-
-    start_str = start_obj.isoformat()
-    end_str = (end_obj + timedelta(days=1)).isoformat()
-
-    # Base WHERE conditions
-    where_conditions = [
-        "create_time >= :start_date",
-        "create_time < :end_date",
-        "HOUR(create_time) BETWEEN 9 AND 18",
-        "temp_num > 0",
-        "rh_num > 0"
-    ]
-    query_params = {"start_date": start_str, "end_date": end_str}
-
-    if dev_ids and len(dev_ids) > 0:
-        where_conditions.append("dev_id IN :dev_ids")
-        query_params["dev_ids"] = tuple(dev_ids)
-
-    where_clause = " AND ".join(where_conditions)
-
-    # Query hourly data for heatmap
-    sql_query = text(f"""
-        SELECT 
-            DATE(create_time) AS day,
-            HOUR(create_time) AS hour,
-            AVG(temp_num) AS avg_temp,
-            AVG(rh_num) AS avg_rh
-        FROM environment_monitor
-        WHERE {where_clause}
-        GROUP BY day, hour
-        ORDER BY day, hour
-    """)
+    # Hourly view defaults to shorter range
+    start_obj, end_obj = parse_date_range(start_date, end_date, 30)
+    dev_ids = await resolve_dev_ids(dev_ids, floor, zone)
+    since = parse_since(since) if since else None
+
+    def build_rows(aggregates):
+        days, hours, temps, rhs = aggregates.hourly()
+        clos = calc.clo_for_dates(clo_strategy, days, manual_clo, dev_ids)
+
+        with calc.solver_telemetry("pmv-hourly-heatmap"):
+            pmvs, _ = calc.get_thermal_comfort_dashboard(
+                ta=temps,
+                rh=rhs,
+                clo=clos,
+                met=metabolic_rate
+            )
 
-    try:
-        results = db.execute(sql_query, query_params).fetchall()
-    except Exception as e:
-        print(f"Hourly query failed: {e}")
-        raise HTTPException(status_code=500, detail=f"Database query failed: {str(e)}")
+        return group_by_day(days, [
+            (day_str, int(hour_val), float(pmv_val))
+            for day_str, hour_val, pmv_val in zip(days, hours, pmvs)
+        ])
 
-    unique_days = sorted(list(set(str(row.day) for row in results)))
-    day_to_idx = {d: i for i, d in enumerate(unique_days)}
-    
+    prefix = cache_prefix("pmv-hourly-heatmap", dev_ids, clo_strategy, manual_clo, metabolic_rate)
     target_hours = list(range(9, 19))
     hour_to_idx = {h: i for i, h in enumerate(target_hours)}
 
-    heatmap_data = []
-    level_counts = {"level1": 0, "level2": 0, "level3": 0}
-    total_count = 0
-
-    for row in results:
-        day_str = str(row.day)
-        hour_val = int(row.hour)
-        temp_val = float(row.avg_temp)
-        rh_val = float(row.avg_rh)
-        
-        date_obj = datetime.strptime(day_str, "%Y-%m-%d")
-        
-        # Determine CLO based on strategy
-        if clo_strategy == "manual":
-            clo_val = manual_clo
-        elif clo_strategy == "month":
-            clo_val = calc.clo_by_month(date_obj)
-        elif clo_strategy == "fixed_summer":
-            clo_val = 0.5
-        elif clo_strategy == "fixed_winter":
-            clo_val = 1.0
-        else:
-            clo_val = calc.clo_fourier_4(date_obj)
-            
-        pmv_val, _ = calc.get_thermal_comfort_vba_base(
-            ta=temp_val,
-            rh=rh_val,
-            vel=0.15,
-            tr=temp_val,
-            clo=clo_val,
-            met=metabolic_rate
+    if since:
+        # Only the (day, hour) cells with readings after `since`; days are given as dates, not indexes
+        rows_by_day, changed, watermark = await changed_rows(
+            prefix, start_obj, end_obj, dev_ids, since, "Hourly", build_rows
         )
-        
-        # Statistics
-        total_count += 1
-        abs_pmv = abs(pmv_val)
-        if abs_pmv <= 0.5:
-            level_counts["level1"] += 1
-        elif abs_pmv <= 1.0:
-            level_counts["level2"] += 1
-        else:
-            level_counts["level3"] += 1
+        return {
+            "since": since,
+            "watermark": watermark,
+            "hours": [f"{h:02d}:00" for h in target_hours],
+            "data": [
+                [day_str, hour_to_idx[hour_val], round(pmv_val, 2)]
+                for rows in rows_by_day.values()
+                for day_str, hour_val, pmv_val in rows
+                if (day_str, hour_val) in changed and hour_val in hour_to_idx
+            ],
+        }
+
+    cells, watermark = await watermarked_rows(prefix, start_obj, end_obj, dev_ids, "Hourly", build_rows)
+
+    unique_days = sorted(set(cell[0] for cell in cells))
+    day_to_idx = {d: i for i, d in enumerate(unique_days)}
 
+    # Statistics
+    abs_pmv = np.abs(np.array([cell[2] for cell in cells], dtype=float))
+    total_count = len(abs_pmv)
+    level_counts = {
+        "level1": int(np.count_nonzero(abs_pmv <= 0.5)),
+        "level2": int(np.count_nonzero((abs_pmv > 0.5) & (abs_pmv <= 1.0))),
+        "level3": int(np.count_nonzero(abs_pmv > 1.0)),
+    }
+
+    heatmap_data = []
+    for day_str, hour_val, pmv_val in cells:
         if day_str in day_to_idx and hour_val in hour_to_idx:
             heatmap_data.append([
                 day_to_idx[day_str],
@@ -348,121 +551,275 @@ def get_pmv_hourly_heatmap(
         "days": unique_days,
         "hours": [f"{h:02d}:00" for h in target_hours],
         "data": heatmap_data,
-        "stats": stats
+        "stats": stats,
+        "watermark": watermark
     }
 
 
 @app.get("/api/daily-trend")
-def get_daily_trend(
+async def get_daily_trend(
     start_date: str | None = None,
     end_date: str | None = None,
     city: str | None = "beijing",
     dev_ids: list[str] | None = Query(None),
+    floor: str | None = None,
+    zone: str | None = None,
     clo_strategy: str = "fourier",
     manual_clo: float = 0.5,
     metabolic_rate: float = 1.0,
-    db: Session = Depends(get_db),
+    since: str | None = None,
 ):
-    if start_date and end_date:
-        try:
-            start_obj = date.fromisoformat(start_date)
-            end_obj = date.fromisoformat(end_date)
-        except ValueError:
-            raise HTTPException(status_code=400, detail="Invalid date format, expected YYYY-MM-DD")
-    else:
-        end_obj = date.today()
-        start_obj = end_obj - timedelta(days=90)
-
-    start_str = start_obj.isoformat()
-    end_str = (end_obj + timedelta(days=1)).isoformat()
-
-    # Base WHERE conditions
-    where_conditions = [
-        "create_time >= :start_date",
-        "create_time < :end_date",
-        "HOUR(create_time) BETWEEN 9 AND 18",
-        "temp_num > 0",
-        "rh_num > 0"
-    ]
-    query_params = {"start_date": start_str, "end_date": end_str}
-
-    if dev_ids and len(dev_ids) > 0:
-        where_conditions.append("dev_id IN :dev_ids")
-        query_params["dev_ids"] = tuple(dev_ids)
-
-    where_clause = " AND ".join(where_conditions)
-
-    sql_query = text(f"""
-        SELECT 
-            DATE(create_time) AS day,
-            AVG(temp_num) AS avg_temp,
-            AVG(rh_num) AS avg_rh
-        FROM environment_monitor
-        WHERE {where_clause}
-        GROUP BY day
-        ORDER BY day
-    """)
+    start_obj, end_obj = parse_date_range(start_date, end_date, 90)
+    dev_ids = await resolve_dev_ids(dev_ids, floor, zone)
+    since = parse_since(since) if since else None
+
+    def build_rows(aggregates):
+        days, temps, rhs = aggregates.daily()
+        clos = calc.clo_for_dates(clo_strategy, days, manual_clo, dev_ids)
+
+        with calc.solver_telemetry("daily-trend"):
+            pmvs, _ = calc.get_thermal_comfort_dashboard(
+                ta=temps,
+                rh=rhs,
+                clo=clos,
+                met=metabolic_rate
+            )
+
+        data = []
+        for day_str, temp_value, rh_value, pmv_val, clo_val in zip(days, temps, rhs, pmvs, clos):
+            temp_value = float(temp_value)
+            rh_value = float(rh_value)
+            pmv_val = float(pmv_val)
+            clo_val = float(clo_val)
+            data.append({
+                "day": day_str,
+                "avg_temp": round(temp_value, 2) if temp_value else None,
+                "avg_rh": round(rh_value, 1) if rh_value else None,
+                "pmv": round(pmv_val, 2) if pmv_val else None,
+                "clo": round(clo_val, 3) if clo_val else None
+            })
+        return group_by_day(days, data)
+
+    prefix = cache_prefix("daily-trend", dev_ids, clo_strategy, manual_clo, metabolic_rate)
+    if since:
+        # Only the days with readings after `since`
+        rows_by_day, _, watermark = await changed_rows(
+            prefix, start_obj, end_obj, dev_ids, since, "Trend", build_rows
+        )
+        data = [row for rows in rows_by_day.values() for row in rows]
+        return {"since": since, "watermark": watermark, "data": data}
+
+    data, watermark = await watermarked_rows(prefix, start_obj, end_obj, dev_ids, "Trend", build_rows)
+    return {"data": data, "watermark": watermark}
+
+
+def device_hourly_matrix(aggregates, clo_strategy, manual_clo, metabolic_rate, dev_ids):
+    """
+    Device × (day, hour) PMV matrix plus the device-weighted average per slot
+    (mean of the devices' hourly means, as in debug_data.py), with one PMV pass for both.
+    """
+    device_names, device_idx = np.unique(aggregates.devices.astype(str), return_inverse=True)
+    slot_keys = aggregates.days.astype(np.int64) * 24 + aggregates.hours
+    slot_values, slot_idx = np.unique(slot_keys, return_inverse=True)
+
+    shape = (len(device_names), len(slot_values))
+    temp = np.full(shape, np.nan)
+    rh = np.full(shape, np.nan)
+    temp[device_idx, slot_idx] = aggregates.sum_temp / aggregates.counts
+    rh[device_idx, slot_idx] = aggregates.sum_rh / aggregates.counts
+
+    device_count = np.count_nonzero(~np.isnan(temp), axis=0)
+    floor_temp = np.nansum(temp, axis=0) / np.maximum(device_count, 1)
+    floor_rh = np.nansum(rh, axis=0) / np.maximum(device_count, 1)
+
+    slot_days = (slot_values // 24).astype("datetime64[D]")
+    device_clo = np.empty(len(aggregates))
+    for i, dev_id in enumerate(device_names):
+        mask = device_idx == i
+        device_clo[mask] = calc.clo_for_dates(clo_strategy, aggregates.days[mask], manual_clo, [dev_id])
+    floor_clo = calc.clo_for_dates(clo_strategy, slot_days, manual_clo, dev_ids)
+
+    with calc.solver_telemetry("device-hourly-pmv"):
+        pmvs, _ = calc.get_thermal_comfort_dashboard(
+            ta=np.concatenate([aggregates.sum_temp / aggregates.counts, floor_temp]),
+            rh=np.concatenate([aggregates.sum_rh / aggregates.counts, floor_rh]),
+            clo=np.concatenate([device_clo, floor_clo]),
+            met=metabolic_rate
+        )
+    pmvs = np.round(pmvs, 2)
+
+    device_pmv = np.full(shape, np.nan)
+    device_pmv[device_idx, slot_idx] = pmvs[:len(aggregates)]
+    floor_pmv = pmvs[len(aggregates):]
+
+    def to_list(values):
+        return [None if np.isnan(v) else float(v) for v in values]
+
+    return {
+        "slots": [
+            {"day": str(day), "hour": f"{int(hour):02d}:00"}
+            for day, hour in zip(slot_days, slot_values % 24)
+        ],
+        "devices": [
+            {"dev_id": dev_id, "pmv": to_list(device_pmv[i])}
+            for i, dev_id in enumerate(device_names.tolist())
+        ],
+        "floor": {
+            "avg_temp": np.round(floor_temp, 2).tolist(),
+            "avg_rh": np.round(floor_rh, 1).tolist(),
+            "pmv": floor_pmv.tolist(),
+            "device_count": device_count.tolist(),
+        },
+        "device_total": len(device_names),
+    }
+
+
+@app.get("/api/device-hourly-pmv")
+async def get_device_hourly_pmv(
+    start_date: str | None = None,
+    end_date: str | None = None,
+    dev_ids: list[str] | None = Query(None),
+    floor: str | None = None,
+    zone: str | None = None,
+    clo_strategy: str = "fourier",
+    manual_clo: float = 0.5,
+    metabolic_rate: float = 1.0,
+):
+    # Same default range as the hourly heatmap
+    start_obj, end_obj = parse_date_range(start_date, end_date, 30)
+    dev_ids = await resolve_dev_ids(dev_ids, floor, zone)
 
     try:
-        results = db.execute(sql_query, query_params).fetchall()
+        aggregates = await database.run_db(aggregation.query_hourly, start_obj, end_obj, dev_ids, True)
     except Exception as e:
-        print(f"Trend query failed: {e}")
+        print(f"Device hourly query failed: {e}")
         raise HTTPException(status_code=500, detail=f"Database query failed: {str(e)}")
 
-    data = []
-    for row in results:
-        day_value = row.day
-        temp_value = float(row.avg_temp) if row.avg_temp is not None else None
-        rh_value = float(row.avg_rh) if row.avg_rh is not None else None
-        
-        pmv_val = None
-        clo_val = None
-        
-        if temp_value is not None and rh_value is not None:
-            date_obj = datetime.combine(day_value, datetime.min.time()) if not isinstance(day_value, datetime) else day_value
-            
-            # Determine CLO based on strategy
-            if clo_strategy == "manual":
-                clo_val = manual_clo
-            elif clo_strategy == "month":
-                clo_val = calc.clo_by_month(date_obj)
-            elif clo_strategy == "fixed_summer":
-                clo_val = 0.5
-            elif clo_strategy == "fixed_winter":
-                clo_val = 1.0
-            else:
-                clo_val = calc.clo_fourier_4(date_obj)
-                
-            pmv_val, _ = calc.get_thermal_comfort_vba_base(
-                ta=temp_value,
-                rh=rh_value,
-                vel=0.15,
-                tr=temp_value,
-                clo=clo_val,
-                met=metabolic_rate
-            )
+    return await run_in_threadpool(
+        device_hourly_matrix, aggregates, clo_strategy, manual_clo, metabolic_rate, dev_ids
+    )
 
-        data.append({
-            "day": str(day_value),
-            "avg_temp": round(temp_value, 2) if temp_value else None,
-            "avg_rh": round(rh_value, 1) if rh_value else None,
-            "pmv": round(pmv_val, 2) if pmv_val else None,
-            "clo": round(clo_val, 3) if clo_val else None
-        })
 
-    return {"data": data}
+@app.get("/api/devices")
+async def get_devices(refresh: bool = False):
+    if refresh or not device_registry.loaded:
+        try:
+            await database.run_db(device_registry.refresh)
+        except Exception as e:
+            print(f"Device registry refresh failed: {e}")
+            raise HTTPException(status_code=500, detail=f"Database query failed: {str(e)}")
+    return device_registry.info()
+
+
+@app.get("/api/live")
+async def live_stream(
+    request: Request,
+    dev_ids: list[str] | None = Query(None),
+    floor: str | None = None,
+    zone: str | None = None,
+):
+    """Server-Sent Events: one `pmv` event per poll with the new readings of the selected devices."""
+    dev_ids = await resolve_dev_ids(dev_ids, floor, zone)
+
+    async def events():
+        subscription = live_poller.subscribe(dev_ids)
+        try:
+            yield f"retry: {int(live.LIVE_POLL_INTERVAL * 1000)}\n\n"
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), timeout=live.LIVE_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: pmv\ndata: {event}\n\n"
+        finally:
+            live_poller.unsubscribe(subscription)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/api/live/stats")
+def get_live_stats():
+    return {
+        "subscribers": live_poller.subscriber_count,
+        "watermark": live_poller.watermark,
+        "stats": dict(live_poller.stats),
+    }
+
+
+@app.get("/api/ready")
+def get_readiness(warm: bool = False):
+    """
+    serving: the app answers requests, with the persisted or default CLO coefficients until the fits finish.
+    model_warm: the CLO model is loaded and the startup fits are done, with no phase failed.
+    errors: {phase: error} of the failed startup phases.
+    warm=true answers 503 until the model is warm, for readiness probes that should wait for it.
+    """
+    info = startup_report.info()
+    errors = {p["name"]: p["error"] for p in info["phases"] if p["error"] is not None}
+    info.update(
+        serving=True,
+        model_warm=info["warm"] and not errors and calc.model_registry.version is not None,
+        errors=errors,
+        model_version=calc.model_registry.version,
+        fourier_fitted_at=(calc.FOURIER_FIT_INFO or {}).get("fitted_at"),
+        clo_models=len(calc.CLO_MODELS),
+    )
+    if warm and not info["model_warm"]:
+        raise HTTPException(status_code=503, detail=info)
+    return info
+
+
+@app.get("/api/cache-stats")
+def get_cache_stats(reset: bool = False):
+    stats = {
+        "results": result_cache.result_cache.info(),
+        "aggregates": dict(aggregation.aggregation_service.stats),
+    }
+    if reset:
+        result_cache.result_cache.reset_stats()
+    return stats
+
+
+@app.get("/api/model-info")
+def get_model_info():
+    return calc.model_registry.info()
+
+
+@app.get("/api/clo-models")
+def get_clo_models():
+    return {
+        "count": len(calc.CLO_MODELS),
+        "models": {
+            key: {"n_days": model["n_days"], "r2": round(model["r2"], 4)}
+            for key, model in sorted(calc.CLO_MODELS.items())
+        },
+    }
+
+
+@app.get("/api/solver-stats")
+def get_solver_stats(reset: bool = False):
+    stats = calc.get_solver_stats()
+    if reset:
+        calc.reset_solver_stats()
+    return {"solver": calc.TCL_SOLVER, "stats": stats}
 
 
 @app.post("/api/calculate-pmv", response_model=schemas.PMVResponse)
 def calculate_pmv_endpoint(payload: schemas.PMVManualRequest):
-    pmv_value, ppd_value = calc.get_thermal_comfort_vba_base(
-        ta=payload.ta,
-        rh=payload.rh,
-        vel=payload.vel,
-        tr=payload.tr,
-        clo=payload.clo,
-        met=payload.met,
-    )
+    with calc.solver_telemetry("calculate-pmv"):
+        pmv_value, ppd_value = calc.get_thermal_comfort_vba_base(
+            ta=payload.ta,
+            rh=payload.rh,
+            vel=payload.vel,
+            tr=payload.tr,
+            clo=payload.clo,
+            met=payload.met,
+        )
 
     return schemas.PMVResponse(
         pmv=round(pmv_value, 2),
@@ -472,3 +829,144 @@ def calculate_pmv_endpoint(payload: schemas.PMVManualRequest):
         rh=payload.rh,
         vel=payload.vel,
     )
+
+
+def _check_batch_size(n):
+    if n > PMV_BATCH_MAX:
+        raise HTTPException(status_code=413, detail=f"Batch too large: {n} rows, maximum is {PMV_BATCH_MAX}")
+
+
+def _pmv_batch_columns(payload: schemas.PMVBatchRequest):
+    """
+    Normalise a batch payload to float columns plus per-element errors.
+    Returns (columns, invalid_mask, errors).
+    """
+    errors = []
+    derived = set()
+    if payload.items is not None:
+        if any(getattr(payload, f) is not None for f in PMV_FIELDS):
+            raise HTTPException(status_code=400, detail="Send either columnar arrays or items, not both")
+        n = len(payload.items)
+        _check_batch_size(n)
+        columns = {f: np.full(n, np.nan) for f in PMV_FIELDS}
+        invalid = np.zeros(n, dtype=bool)
+        for i, item in enumerate(payload.items):
+            try:
+                req = schemas.PMVManualRequest.model_validate(item)
+            except ValidationError as e:
+                invalid[i] = True
+                for err in e.errors():
+                    field = ".".join(str(loc) for loc in err["loc"]) or "item"
+                    errors.append(schemas.PMVBatchError(index=i, field=field, message=err["msg"]))
+                continue
+            for f in PMV_FIELDS:
+                columns[f][i] = getattr(req, f)
+    else:
+        given = {f: getattr(payload, f) for f in PMV_FIELDS if getattr(payload, f) is not None}
+        missing = [f for f in ("ta", "rh", "vel", "clo") if f not in given]
+        if missing:
+            raise HTTPException(status_code=400, detail=f"Missing columns: {', '.join(missing)}")
+        n = len(given["ta"])
+        mismatched = [f for f, values in given.items() if len(values) != n]
+        if mismatched:
+            raise HTTPException(status_code=400, detail=f"Columns {', '.join(mismatched)} do not match the length of ta ({n})")
+        _check_batch_size(n)
+        columns = {
+            f: np.array([np.nan if v is None else v for v in values], dtype=float)
+            for f, values in given.items()
+        }
+        if "tr" not in columns:
+            columns["tr"] = columns["ta"].copy()
+            derived.add("tr")
+        if "met" not in columns:
+            columns["met"] = np.ones(n)
+            derived.add("met")
+        invalid = np.zeros(n, dtype=bool)
+
+    parsed_invalid = invalid.copy()
+    for f in PMV_FIELDS:
+        if f in derived:
+            continue
+        values = columns[f]
+        finite = np.isfinite(values)
+        for i in np.flatnonzero(~finite & ~parsed_invalid):
+            errors.append(schemas.PMVBatchError(index=int(i), field=f, message="must be a finite number"))
+        low, high = schemas.PMV_BOUNDS[f]
+        with np.errstate(invalid="ignore"):
+            out_of_range = finite & ((values < low) | (values > high))
+        for i in np.flatnonzero(out_of_range & ~parsed_invalid):
+            errors.append(schemas.PMVBatchError(index=int(i), field=f, message=f"must be between {low} and {high}"))
+        invalid |= ~finite | out_of_range
+
+    errors.sort(key=lambda e: e.index)
+    return columns, invalid, errors
+
+
+@app.post("/api/calculate-pmv/batch", response_model=schemas.PMVBatchResponse)
+def calculate_pmv_batch_endpoint(payload: schemas.PMVBatchRequest):
+    columns, invalid, errors = _pmv_batch_columns(payload)
+    valid = ~invalid
+
+    pmv_values = np.full(len(invalid), np.nan)
+    ppd_values = np.full(len(invalid), np.nan)
+    with calc.solver_telemetry("calculate-pmv-batch"):
+        pmv_values[valid], ppd_values[valid] = calc.get_thermal_comfort_vba_vec(
+            ta=columns["ta"][valid],
+            rh=columns["rh"][valid],
+            vel=columns["vel"][valid],
+            tr=columns["tr"][valid],
+            clo=columns["clo"][valid],
+            met=columns["met"][valid],
+        )
+
+    # Rows that pass the bounds but still overflow are reported, never returned as a silent null
+    unsolved = valid & ~(np.isfinite(pmv_values) & np.isfinite(ppd_values))
+    if unsolved.any():
+        for i in np.flatnonzero(unsolved):
+            errors.append(schemas.PMVBatchError(index=int(i), field="pmv", message="calculation did not produce a finite result"))
+        errors.sort(key=lambda e: e.index)
+        valid &= ~unsolved
+
+    return schemas.PMVBatchResponse(
+        count=len(invalid),
+        pmv=[round(float(v), 2) if ok else None for v, ok in zip(pmv_values, valid)],
+        ppd=[round(float(v), 1) if ok else None for v, ok in zip(ppd_values, valid)],
+        errors=errors,
+    )
+
+
+@app.post("/api/ingest", response_model=schemas.IngestResponse)
+def ingest_readings(payload: schemas.IngestRequest):
+    n = len(payload.readings)
+    if n > INGEST_BATCH_MAX:
+        raise HTTPException(status_code=413, detail=f"Batch too large: {n} readings, maximum is {INGEST_BATCH_MAX}")
+
+    rows = []
+    errors = []
+    for i, item in enumerate(payload.readings):
+        try:
+            reading = schemas.EnvironmentReading.model_validate(item)
+        except ValidationError as e:
+            message = "; ".join(
+                f"{'.'.join(str(loc) for loc in err['loc']) or 'item'}: {err['msg']}" for err in e.errors()
+            )
+            errors.append(schemas.IngestError(index=i, message=message))
+            continue
+        rows.append(crud.reading_to_row(reading))
+
+    if rows and not ingest_writer.submit(rows):
+        raise HTTPException(status_code=503, detail="Ingest queue is full, retry later")
+
+    return schemas.IngestResponse(
+        accepted=len(rows),
+        rejected=len(errors),
+        errors=errors,
+        queue_depth=ingest_writer.queue_depth,
+    )
+
+
+@app.get("/api/ingest/stats")
+def get_ingest_stats(flush: bool = False):
+    if flush:
+        ingest_writer.flush()
+    return ingest_writer.info()
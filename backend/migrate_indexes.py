@@ -0,0 +1,124 @@
+import sys
+import os
+import time
+from datetime import date, timedelta
+
+# Add the parent directory to sys.path to allow importing from backend module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.database import get_engine
+from backend.aggregation import LEGACY_COLUMNS, SHADOW_COLUMNS, SHADOW_COLUMN_NAMES, build_where, raw_hourly_sql
+from sqlalchemy import Float, inspect, text
+
+# 与旧查询中 varchar 隐式转换（temp_num + 0）取值一致：取开头的数字部分（'22.'、'+22'、'1e-05'、'22.5C' 均有效），
+# 没有数字开头的值为 NULL（旧查询得 0），同样被 > 0 过滤。只对匹配到的数字串做 + 0，严格模式下不会因截断报错
+_NUMBER = " *[-+]?([0-9]+[.]?[0-9]*|[.][0-9]+)([eE][-+]?[0-9]+)?"
+# REGEXP_SUBSTR needs MySQL 8.0.4; older servers only convert values that are a number as a whole
+_REGEXP_SUBSTR_VERSION = (8, 0, 4)
+
+READING_COLUMNS = {"temp_val": "temp_num", "rh_val": "rh_num"}
+
+
+def reading_value_sql(column, server_version):
+    if server_version >= _REGEXP_SUBSTR_VERSION:
+        return f"REGEXP_SUBSTR({column}, '^{_NUMBER}') + 0"
+    return f"CASE WHEN {column} REGEXP '^{_NUMBER}$' THEN {column} + 0 END"
+
+
+def column_ddl(server_version):
+    """Stored generated columns mirroring the varchar readings and HOUR(create_time) (MySQL 5.7+)"""
+    ddl = {
+        name: f"DOUBLE GENERATED ALWAYS AS ({reading_value_sql(source, server_version)}) STORED"
+        for name, source in READING_COLUMNS.items()
+    }
+    ddl["hour_of_day"] = "TINYINT GENERATED ALWAYS AS (HOUR(create_time)) STORED"
+    return ddl
+
+
+# Covers the whole dashboard aggregation: range scan on create_time, everything else read from the index
+INDEX_NAME = "idx_env_time_dev_hour_temp_rh"
+INDEX_COLUMNS = ("create_time", "dev_id", "hour_of_day", "temp_val", "rh_val")
+
+
+def existing_schema(conn):
+    """({column name: type}, {index names}) of environment_monitor"""
+    inspector = inspect(conn)
+    columns = {c["name"]: c["type"] for c in inspector.get_columns("environment_monitor")}
+    indexes = {i["name"] for i in inspector.get_indexes("environment_monitor")}
+    return columns, indexes
+
+
+def outdated_columns(columns):
+    """Reading columns added by an earlier version of this script as DECIMAL(8,2), which rounded the readings"""
+    return [name for name in READING_COLUMNS if name in columns and not isinstance(columns[name], Float)]
+
+
+def report(conn, label, columns, days):
+    """EXPLAIN plus best-of-3 wall time for the dashboard aggregation over the last `days` days."""
+    end_obj = date.today()
+    where_clause, params = build_where(end_obj - timedelta(days=days), end_obj, None, columns)
+    sql_query = raw_hourly_sql(where_clause, columns)
+
+    print(f"\n=== {label} ===")
+    for row in conn.execute(text(f"EXPLAIN {sql_query.text}"), params).mappings():
+        print(f"  table={row['table']} type={row['type']} key={row['key']} rows={row['rows']} extra={row['Extra']}")
+
+    timings = []
+    for _ in range(3):
+        started = time.perf_counter()
+        n = len(conn.execute(sql_query, params).fetchall())
+        timings.append(time.perf_counter() - started)
+    print(f"  {n} (day, hour) rows, best of 3: {min(timings) * 1000:.1f} ms")
+    return min(timings)
+
+
+def migrate(conn):
+    columns, indexes = existing_schema(conn)
+    outdated = outdated_columns(columns)
+    for name, ddl in column_ddl(conn.dialect.server_version_info).items():
+        if name in outdated:
+            print(f"Rebuilding column {name} as DOUBLE ...")
+            conn.execute(text(f"ALTER TABLE environment_monitor MODIFY COLUMN {name} {ddl}"))
+            continue
+        if name in columns:
+            print(f"Column {name} already exists")
+            continue
+        print(f"Adding column {name} ...")
+        conn.execute(text(f"ALTER TABLE environment_monitor ADD COLUMN {name} {ddl}"))
+
+    if INDEX_NAME in indexes:
+        print(f"Index {INDEX_NAME} already exists")
+    else:
+        print(f"Creating index {INDEX_NAME} ...")
+        conn.execute(text(f"CREATE INDEX {INDEX_NAME} ON environment_monitor ({', '.join(INDEX_COLUMNS)})"))
+
+
+def main():
+    apply = "--apply" in sys.argv
+    days = 90
+    if "--days" in sys.argv:
+        days = int(sys.argv[sys.argv.index("--days") + 1])
+
+    engine = get_engine()
+    if engine.dialect.name != "mysql":
+        print(f"Generated columns are only migrated on MySQL (current backend: {engine.dialect.name})")
+        sys.exit(1)
+
+    with engine.connect() as conn:
+        columns, _ = existing_schema(conn)
+        migrated = set(SHADOW_COLUMN_NAMES) <= set(columns) and not outdated_columns(columns)
+
+        before = report(conn, "Before: HOUR(create_time) / varchar predicates", LEGACY_COLUMNS, days)
+        if not migrated:
+            if not apply:
+                print("\nDry run: pass --apply to add the generated columns and covering index")
+                return
+            migrate(conn)
+            conn.commit()
+
+        after = report(conn, "After: hour_of_day / numeric columns + covering index", SHADOW_COLUMNS, days)
+        print(f"\nSpeed-up: {before / after:.1f}x (restart the backend so queries switch to the new columns)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+import hashlib
+import os
+import threading
+from datetime import datetime
+
+from .clo_predictor import CLOPredictor
+
+
+class ModelRegistry:
+    """
+    Holds the active CLOPredictor and swaps in a new one when the model file changes.
+    Readers just take the current reference, so a reload never blocks in-flight requests;
+    requests that already hold the old predictor finish with it.
+    """
+
+    def __init__(self, path, poll_interval=5.0):
+        self.path = os.path.abspath(path)
+        self.poll_interval = poll_interval
+        self._predictor = None
+        self._version = None
+        self._mtime = None
+        self._loaded_at = None
+        self._reload_lock = threading.Lock()
+        self._listeners = []
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def version(self):
+        return self._version
+
+    def add_listener(self, callback):
+        """callback(predictor) is called after every swap, e.g. to drop caches built from the old model."""
+        self._listeners.append(callback)
+
+    def get(self):
+        predictor = self._predictor
+        if predictor is None:
+            self.reload()
+            predictor = self._predictor
+        return predictor
+
+    def reload(self, force=False):
+        """Load the model file if its mtime and content hash changed. Returns True if a new model was swapped in."""
+        with self._reload_lock:
+            if not os.path.exists(self.path):
+                if self._predictor is None:
+                    # Fallback to a predictor that uses the default coefficients
+                    self._swap(CLOPredictor("default"), "default", None)
+                    return True
+                return False
+
+            mtime = os.path.getmtime(self.path)
+            if not force and self._predictor is not None and mtime == self._mtime:
+                return False
+
+            with open(self.path, 'rb') as f:
+                version = hashlib.sha256(f.read()).hexdigest()[:12]
+            if not force and version == self._version:
+                self._mtime = mtime
+                return False
+
+            predictor = CLOPredictor(self.path)
+            if predictor.is_default and self._predictor is not None:
+                # Unreadable (e.g. half-written) file: keep serving the current model, retry on the next poll
+                print(f"Could not load {self.path}, keeping model version {self._version}")
+                return False
+            self._swap(predictor, version, mtime)
+            return True
+
+    def _swap(self, predictor, version, mtime):
+        self._predictor = predictor
+        self._version = version
+        self._mtime = mtime
+        self._loaded_at = datetime.now()
+        for callback in self._listeners:
+            try:
+                callback(predictor)
+            except Exception as e:
+                print(f"Model reload listener failed: {e}")
+        print(f"Active CLO model version {version} from {predictor.model_path}")
+
+    def start(self):
+        """Poll the model file in a daemon thread; no-op if polling is disabled or already running."""
+        if self.poll_interval <= 0 or (self._thread and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, name="clo-model-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.reload()
+            except Exception as e:
+                print(f"Model reload failed, keeping version {self._version}: {e}")
+
+    def info(self):
+        predictor = self.get()
+        data = predictor.model_data or {}
+        return {
+            "version": self._version,
+            "path": predictor.model_path,
+            "model_name": data.get('model_name') or data.get('name'),
+            "model_type": data.get('model_type') or data.get('type'),
+            "r2_score": data.get('r2_score'),
+            "loaded_at": self._loaded_at.isoformat(timespec="seconds") if self._loaded_at else None,
+            "watching": bool(self._thread and self._thread.is_alive()),
+        }
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Float, DateTime, String, cast
+from sqlalchemy import Column, Integer, Float, Date, DateTime, String, cast
 from sqlalchemy.sql import func
 from .database import Base
 
@@ -32,3 +32,44 @@ class EnvironmentMonitor(Base):
             return float(self.rh_num) if self.rh_num else None
         except ValueError:
             return None
+
+
+class EnvironmentHourlyRollup(Base):
+    """Per-device hourly sums/counts/min/max of environment_monitor, maintained by backend/rollup.py"""
+    __tablename__ = "environment_hourly_rollup"
+
+    dev_id = Column(String(255), primary_key=True)
+    day = Column(Date, primary_key=True)
+    hour = Column(Integer, primary_key=True)
+
+    # 温湿度只统计两者都 > 0 的读数（PMV 需要同时有温度和湿度）
+    # Float(53): DOUBLE on MySQL/DuckDB, plain FLOAT would keep sums in single precision
+    temp_sum = Column(Float(53))
+    temp_count = Column(Integer)
+    temp_min = Column(Float(53))
+    temp_max = Column(Float(53))
+    rh_sum = Column(Float(53))
+    rh_count = Column(Integer)
+    rh_min = Column(Float(53))
+    rh_max = Column(Float(53))
+    co2_sum = Column(Float(53))
+    co2_count = Column(Integer)
+    co2_min = Column(Float(53))
+    co2_max = Column(Float(53))
+    pm_sum = Column(Float(53))
+    pm_count = Column(Integer)
+    pm_min = Column(Float(53))
+    pm_max = Column(Float(53))
+    tvoc_sum = Column(Float(53))
+    tvoc_count = Column(Integer)
+    tvoc_min = Column(Float(53))
+    tvoc_max = Column(Float(53))
+
+
+class RollupWatermark(Base):
+    """Raw readings before `watermark` (always on an hour boundary) are already in the rollup table"""
+    __tablename__ = "rollup_watermark"
+
+    name = Column(String(64), primary_key=True)
+    watermark = Column(DateTime)
+    updated_at = Column(DateTime)
@@ -0,0 +1,113 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, timedelta
+
+# Upper bound on cached (endpoint, filters, day) entries across all dashboards
+RESULT_CACHE_MAX_DAYS = int(os.getenv("RESULT_CACHE_MAX_DAYS", "20000"))
+# Seconds a result for today (or a future day) stays valid
+RESULT_CACHE_TODAY_TTL = float(os.getenv("RESULT_CACHE_TODAY_TTL", "60"))
+# Seconds a closed day stays valid (0 = until evicted). Backfills only invalidate the cache of
+# the worker that wrote them, so this bounds how long other workers serve the old rows
+RESULT_CACHE_CLOSED_TTL = float(os.getenv("RESULT_CACHE_CLOSED_TTL", "600"))
+
+
+class DayResultCache:
+    """
+    LRU cache of computed endpoint rows, one entry per day.
+    Keys are (prefix, day) where prefix identifies the endpoint and every input that
+    changes its output (dev_ids, CLO strategy, metabolic rate, CLO model state).
+    """
+
+    def __init__(self, max_days=RESULT_CACHE_MAX_DAYS, today_ttl=RESULT_CACHE_TODAY_TTL,
+                 closed_ttl=RESULT_CACHE_CLOSED_TTL):
+        self.max_days = max_days
+        self.today_ttl = today_ttl
+        self.closed_ttl = closed_ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def lookup(self, prefix, days):
+        """Returns ({day: rows} for cached days, [missing days in order])."""
+        found = {}
+        missing = []
+        now = time.monotonic()
+        with self._lock:
+            for day in days:
+                key = (prefix, day)
+                entry = self._entries.get(key)
+                if entry is not None and (entry[0] is None or entry[0] > now):
+                    self._entries.move_to_end(key)
+                    found[day] = entry[1]
+                else:
+                    missing.append(day)
+            self.stats["hits"] += len(found)
+            self.stats["misses"] += len(missing)
+        return found, missing
+
+    def store(self, prefix, day, rows):
+        # Today's data is still arriving; closed days only change through backfills
+        if day >= date.today():
+            expires = time.monotonic() + self.today_ttl
+        else:
+            expires = time.monotonic() + self.closed_ttl if self.closed_ttl > 0 else None
+        with self._lock:
+            self._entries[(prefix, day)] = (expires, rows)
+            self._entries.move_to_end((prefix, day))
+            while len(self._entries) > self.max_days:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def _fill(self, prefix, days, found, missing, computed):
+        for day in missing:
+            rows = computed.get(day.isoformat(), [])
+            self.store(prefix, day, rows)
+            found[day] = rows
+        return [row for day in days for row in found[day]]
+
+    @staticmethod
+    def _days(start_obj, end_obj):
+        return [start_obj + timedelta(days=i) for i in range((end_obj - start_obj).days + 1)]
+
+    def get_or_compute(self, prefix, start_obj, end_obj, compute):
+        """
+        Rows for every day in [start_obj, end_obj], in day order.
+        compute(first_day, last_day) must return {day ISO string: rows} and is only called
+        for the span of days that are not cached.
+        """
+        days = self._days(start_obj, end_obj)
+        found, missing = self.lookup(prefix, days)
+        computed = compute(missing[0], missing[-1]) if missing else {}
+        return self._fill(prefix, days, found, missing, computed)
+
+    async def get_or_compute_async(self, prefix, start_obj, end_obj, compute):
+        """get_or_compute for a coroutine `compute`."""
+        days = self._days(start_obj, end_obj)
+        found, missing = self.lookup(prefix, days)
+        computed = await compute(missing[0], missing[-1]) if missing else {}
+        return self._fill(prefix, days, found, missing, computed)
+
+    def info(self):
+        with self._lock:
+            return dict(self.stats, entries=len(self._entries), max_days=self.max_days)
+
+    def reset_stats(self):
+        with self._lock:
+            for key in self.stats:
+                self.stats[key] = 0
+
+    def invalidate_days(self, days):
+        """Drop every endpoint's entry for `days`, e.g. after readings for a closed day were backfilled."""
+        days = set(days)
+        with self._lock:
+            for key in [key for key in self._entries if key[1] in days]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+result_cache = DayResultCache()
@@ -0,0 +1,178 @@
+import os
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, text
+
+from . import dialects, models
+
+ROLLUP_NAME = "environment_hourly_rollup"
+# Seconds between incremental rollup runs; 0 disables the background job
+ROLLUP_INTERVAL = float(os.getenv("ROLLUP_INTERVAL", "300"))
+# Hours aggregated per transaction, so the first backfill doesn't run as one huge INSERT
+ROLLUP_CHUNK_HOURS = int(os.getenv("ROLLUP_CHUNK_HOURS", str(24 * 7)))
+
+# 温湿度成对统计：只有 temp_num > 0 且 rh_num > 0 的读数计入（与原 AVG 查询的过滤条件一致）
+_COMFORT_COLUMNS = ("temp_num", "rh_num")
+_METRICS = (
+    ("temp", "temp_num", _COMFORT_COLUMNS),
+    ("rh", "rh_num", _COMFORT_COLUMNS),
+    ("co2", "co2_num", ("co2_num",)),
+    ("pm", "pm_num", ("pm_num",)),
+    ("tvoc", "tvoc_num", ("tvoc_num",)),
+)
+
+
+def _format_dt(value):
+    return value.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def floor_hour(value):
+    return value.replace(minute=0, second=0, microsecond=0)
+
+
+def _rollup_insert_sql(dialect):
+    day, hour = dialects.date_sql(dialect), dialects.hour_sql(dialect)
+    columns = ["dev_id", "day", "hour"]
+    selects = ["dev_id", day, hour]
+    for name, column, required in _METRICS:
+        valid = " AND ".join(f"{dialects.number_sql(dialect, c)} > 0" for c in required)
+        # varchar 列先 +0 转为数值，否则 MIN/MAX 会按字符串比较
+        value = f"CASE WHEN {valid} THEN {dialects.number_sql(dialect, column)} + 0 END"
+        columns += [f"{name}_sum", f"{name}_count", f"{name}_min", f"{name}_max"]
+        selects += [f"SUM({value})", f"COUNT({value})", f"MIN({value})", f"MAX({value})"]
+    return text(f"""
+        INSERT INTO environment_hourly_rollup ({", ".join(columns)})
+        SELECT {", ".join(selects)}
+        FROM environment_monitor
+        WHERE create_time >= :lo AND create_time < :hi
+        GROUP BY dev_id, {day}, {hour}
+    """)
+
+
+def _hour_range_condition():
+    """(day, hour) in [lo, hi) for hour-aligned lo/hi"""
+    return """
+        (day > :lo_day OR (day = :lo_day AND hour >= :lo_hour))
+        AND (day < :hi_day OR (day = :hi_day AND hour < :hi_hour))
+    """
+
+
+def _rebuild(db, insert_sql, delete_sql, lo, hi):
+    """Replace the rollup rows of the hours in [lo, hi) with a fresh aggregate (no commit)."""
+    bounds = {
+        "lo_day": lo.date().isoformat(), "lo_hour": lo.hour,
+        "hi_day": hi.date().isoformat(), "hi_hour": hi.hour,
+    }
+    db.execute(delete_sql, bounds)
+    db.execute(insert_sql, {"lo": _format_dt(lo), "hi": _format_dt(hi)})
+
+
+def _delete_sql():
+    return text(f"DELETE FROM environment_hourly_rollup WHERE {_hour_range_condition()}")
+
+
+def get_watermark(db):
+    """First raw create_time not yet covered by the rollup table, or None if it was never built."""
+    state = db.get(models.RollupWatermark, ROLLUP_NAME)
+    return state.watermark if state else None
+
+
+def refresh_rollup(db, now=None):
+    """
+    Aggregate every closed hour between the watermark and the current hour into the rollup table.
+    Each chunk is replaced and the watermark advanced in one transaction, so a crash mid-run
+    just redoes that chunk. Returns the number of hours processed.
+    """
+    open_hour = floor_hour(now or datetime.now())
+    state = db.get(models.RollupWatermark, ROLLUP_NAME)
+    if state is None:
+        first = db.query(func.min(models.EnvironmentMonitor.create_time)).scalar()
+        if first is None:
+            return 0
+        if isinstance(first, str):
+            first = datetime.fromisoformat(first)
+        state = models.RollupWatermark(name=ROLLUP_NAME, watermark=floor_hour(first))
+        db.add(state)
+        db.commit()
+
+    insert_sql = _rollup_insert_sql(dialects.dialect_name(db))
+    delete_sql = _delete_sql()
+    processed = 0
+    lo = state.watermark
+    while lo < open_hour:
+        hi = min(lo + timedelta(hours=ROLLUP_CHUNK_HOURS), open_hour)
+        try:
+            _rebuild(db, insert_sql, delete_sql, lo, hi)
+            state.watermark = hi
+            state.updated_at = datetime.now()
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        processed += int((hi - lo).total_seconds() // 3600)
+        lo = hi
+    return processed
+
+
+def refresh_hours(db, hours):
+    """
+    Re-aggregate already rolled-up hours (datetimes on the hour) from the raw readings, for
+    readings that arrived after their hour was closed. Consecutive hours are rebuilt together,
+    at most ROLLUP_CHUNK_HOURS per transaction. Returns the number of hours processed.
+    """
+    insert_sql = _rollup_insert_sql(dialects.dialect_name(db))
+    delete_sql = _delete_sql()
+    runs = []
+    for hour in sorted(set(hours)):
+        if runs and runs[-1][1] == hour and (hour - runs[-1][0]) < timedelta(hours=ROLLUP_CHUNK_HOURS):
+            runs[-1][1] = hour + timedelta(hours=1)
+        else:
+            runs.append([hour, hour + timedelta(hours=1)])
+    for lo, hi in runs:
+        try:
+            _rebuild(db, insert_sql, delete_sql, lo, hi)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+    return sum(int((hi - lo).total_seconds() // 3600) for lo, hi in runs)
+
+
+class RollupJob:
+    """Runs refresh_rollup every `interval` seconds in a daemon thread."""
+
+    def __init__(self, session_factory, interval=ROLLUP_INTERVAL):
+        self.session_factory = session_factory
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def run_once(self):
+        db = self.session_factory()
+        try:
+            hours = refresh_rollup(db)
+            if hours:
+                print(f"Hourly rollup advanced by {hours} hours")
+            return hours
+        finally:
+            db.close()
+
+    def start(self):
+        if self.interval <= 0 or (self._thread and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="hourly-rollup", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while True:
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"Hourly rollup failed: {e}")
+            if self._stop.wait(self.interval):
+                return
@@ -1,6 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import Optional
+from typing import Any, List, Optional
 
 class SensorDataBase(BaseModel):
     temperature: float
@@ -36,10 +36,80 @@ class PMVResponse(BaseModel):
     vel: float
 
 
+# PMV 输入的物理范围（闭区间）；超出范围的输入会让模型给出无意义或非有限的结果
+PMV_BOUNDS = {
+    "ta": (-40, 80),
+    "tr": (-40, 80),
+    "rh": (0, 100),
+    "vel": (0, 5),
+    "clo": (0, 4),
+    "met": (0.5, 10),
+}
+
+
 class PMVManualRequest(BaseModel):
-    ta: float
-    rh: float
-    vel: float
-    tr: float
-    clo: float
-    met: float = 1.0
+    ta: float = Field(ge=PMV_BOUNDS["ta"][0], le=PMV_BOUNDS["ta"][1])
+    rh: float = Field(ge=PMV_BOUNDS["rh"][0], le=PMV_BOUNDS["rh"][1])
+    vel: float = Field(ge=PMV_BOUNDS["vel"][0], le=PMV_BOUNDS["vel"][1])
+    tr: float = Field(ge=PMV_BOUNDS["tr"][0], le=PMV_BOUNDS["tr"][1])
+    clo: float = Field(ge=PMV_BOUNDS["clo"][0], le=PMV_BOUNDS["clo"][1])
+    met: float = Field(1.0, ge=PMV_BOUNDS["met"][0], le=PMV_BOUNDS["met"][1])
+
+
+class PMVBatchRequest(BaseModel):
+    # 列式输入：各数组等长；tr 缺省时等于 ta，met 缺省时为 1.0
+    ta: Optional[List[Optional[float]]] = None
+    rh: Optional[List[Optional[float]]] = None
+    vel: Optional[List[Optional[float]]] = None
+    tr: Optional[List[Optional[float]]] = None
+    clo: Optional[List[Optional[float]]] = None
+    met: Optional[List[Optional[float]]] = None
+    # 或者：逐条请求列表（每条按 PMVManualRequest 单独校验）
+    items: Optional[List[Any]] = None
+
+
+class PMVBatchError(BaseModel):
+    index: int
+    field: str
+    message: str
+
+
+class PMVBatchResponse(BaseModel):
+    count: int
+    pmv: List[Optional[float]]
+    ppd: List[Optional[float]]
+    errors: List[PMVBatchError]
+
+
+class EnvironmentReading(BaseModel):
+    # 对应 environment_monitor 的一行；数值按 float 校验，入库时转为字符串
+    dev_id: str = Field(min_length=1, max_length=255)
+    create_time: datetime
+    temp_num: Optional[float] = Field(None, ge=-40, le=80)
+    rh_num: Optional[float] = Field(None, ge=0, le=100)
+    tvoc_num: Optional[float] = Field(None, ge=0)
+    pm_num: Optional[float] = Field(None, ge=0)
+    co2_num: Optional[float] = Field(None, ge=0)
+    product_key: Optional[str] = Field(None, max_length=255)
+    project_id: Optional[str] = Field(None, max_length=64)
+    space_id: Optional[int] = None
+
+
+class IngestRequest(BaseModel):
+    # 每条单独校验，无效条目不影响同批其他数据
+    readings: List[Any]
+
+
+class IngestError(BaseModel):
+    index: int
+    message: str
+
+
+class IngestResponse(BaseModel):
+    # accepted 表示通过校验并进入写入队列，尚未落库。写入失败的批次按指数退避重试
+    # （INGEST_MAX_ATTEMPTS 次），用尽后才计入 /api/ingest/stats 的 failed 并丢弃；
+    # 已存在的 (create_time, dev_id) 会被跳过，所以重发同一批数据是安全的。
+    accepted: int
+    rejected: int
+    errors: List[IngestError]
+    queue_depth: int
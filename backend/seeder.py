@@ -1,84 +1,242 @@
-import random
+import argparse
+import csv
+import time
 import datetime
-import math
+
+import numpy as np
+from sqlalchemy import text
 from sqlalchemy.orm import Session
-from . import models, schemas, crud, database
+from . import crud, database, dialects, models
+
+# 与前端楼层选择一致
+FLOORS = (6, 7, 8, 9, 12, 14)
+COLUMNS = ("create_time", "dev_id", "temp_num", "rh_num", "tvoc_num", "pm_num", "co2_num")
+
 
-def seed_yearly_data(db: Session):
+def make_dev_ids(n_devices):
+    """Structured dev_ids spread round-robin over FLOORS, e.g. SJ-A0-C01-06F-00-CGQ-0001."""
+    return [
+        f"SJ-A0-C01-{FLOORS[i % len(FLOORS)]:02d}F-00-CGQ-{i + 1:04d}"
+        for i in range(n_devices)
+    ]
+
+
+def generate_day(day, n_devices, interval_minutes=1, rng=None, device_offsets=None, drop_rate=0.02):
+    """
+    One day of readings for every device as NumPy arrays (device-major, time-minor).
+    Temperature follows a seasonal cosine plus a diurnal swing peaking at 14:00, RH moves
+    against the diurnal swing, and CO2 / TVOC follow office occupancy (weekdays 8-19).
+    PM is higher in winter. A fraction `drop_rate` of readings is missing, like real sensors.
+    Returns a dict keyed by COLUMNS, with "dev_idx" (index into the dev_id list) instead of dev_id.
     """
-    Generates mock sensor data for a full year (2025).
-    Focuses on 9:00 - 18:00 daily.
+    rng = rng if rng is not None else np.random.default_rng()
+    if device_offsets is None:
+        device_offsets = np.zeros(n_devices)
+
+    day64 = np.datetime64(day, "D")
+    minutes = np.arange(0, 24 * 60, interval_minutes)
+    hours = minutes / 60.0
+    doy = (day64 - day64.astype("datetime64[Y]")).astype(int) + 1
+    weekday = (day64.astype(np.int64) + 3) % 7  # 0 = Monday
+    season = 2 * np.pi * doy / 365.0
+
+    # Per-time-of-day profiles shared by all devices, shape (T,)
+    seasonal_temp = 22 - 8 * np.cos(season)
+    diurnal = -2 + 5 * np.sin(np.clip((hours - 9) / 9.0, 0, 1) * np.pi)
+    occupied = ((hours >= 8) & (hours < 19)).astype(float) if weekday < 5 else np.zeros_like(hours)
+    occupancy = occupied * np.sin(np.clip((hours - 8) / 11.0, 0, 1) * np.pi) ** 0.5
+
+    shape = (n_devices, len(minutes))
+    temp = seasonal_temp + diurnal + device_offsets[:, None] + rng.normal(0, 0.5, shape)
+    rh = np.clip(50 - 2 * diurnal - 10 * np.cos(season) + rng.normal(0, 3, shape), 15, 95)
+    co2 = 420 + 650 * occupancy * rng.uniform(0.6, 1.2, (n_devices, 1)) + rng.normal(0, 25, shape)
+    pm = np.clip(25 + 20 * np.cos(season) + rng.normal(0, 6, shape), 1, None)
+    tvoc = np.clip(0.08 + 0.35 * occupancy + rng.normal(0, 0.03, shape), 0.01, None)
+
+    # Stagger devices by a few seconds so readings don't all share one timestamp
+    times = day64 + minutes.astype("timedelta64[m]")
+    stagger = (np.arange(n_devices) % 60).astype("timedelta64[s]")
+    create_time = times[None, :] + stagger[:, None]
+    dev_idx = np.broadcast_to(np.arange(n_devices)[:, None], shape)
+
+    keep = rng.random(shape) >= drop_rate
+    return {
+        "create_time": create_time[keep],
+        "dev_idx": dev_idx[keep],
+        "temp_num": temp[keep],
+        "rh_num": rh[keep],
+        "tvoc_num": tvoc[keep],
+        "pm_num": pm[keep],
+        "co2_num": co2[keep],
+    }
+
+
+def generate(start_date, end_date, n_devices, interval_minutes=1, seed=0):
+    """Yields (day, chunk) for every day in [start_date, end_date]; memory is bounded by one day."""
+    rng = np.random.default_rng(seed)
+    device_offsets = rng.normal(0, 1.0, n_devices)
+    day = start_date
+    while day <= end_date:
+        yield day, generate_day(day, n_devices, interval_minutes, rng, device_offsets)
+        day += datetime.timedelta(days=1)
+
+
+def _formatted(chunk, dev_ids):
+    """String columns as stored in environment_monitor (the readings are varchar)."""
+    names = np.asarray(dev_ids, dtype=object)
+    return {
+        "create_time": chunk["create_time"].astype("datetime64[s]"),
+        "dev_id": names[chunk["dev_idx"]],
+        "temp_num": np.char.mod("%.1f", chunk["temp_num"]),
+        "rh_num": np.char.mod("%.1f", chunk["rh_num"]),
+        "tvoc_num": np.char.mod("%.3f", chunk["tvoc_num"]),
+        "pm_num": np.char.mod("%.0f", chunk["pm_num"]),
+        "co2_num": np.char.mod("%.0f", chunk["co2_num"]),
+    }
+
+
+def _load_into_duckdb(db: Session, cols):
+    # duckdb_engine runs executemany row by row; DuckDB scans the NumPy columns directly instead
+    raw = db.connection().connection.driver_connection
+    raw.register("seed_chunk", cols)
+    try:
+        names = ", ".join(COLUMNS)
+        db.execute(text(f"INSERT OR IGNORE INTO environment_monitor ({names}) SELECT {names} FROM seed_chunk"))
+        db.commit()
+    finally:
+        raw.unregister("seed_chunk")
+    return len(cols["dev_id"])
+
+
+def load_into_db(db: Session, chunk, dev_ids, batch_rows=20000):
+    """Bulk-insert one generated chunk through crud.insert_readings (multi-row executemany)."""
+    cols = _formatted(chunk, dev_ids)
+    if dialects.dialect_name(db) == dialects.DUCKDB:
+        return _load_into_duckdb(db, cols)
+    cols["create_time"] = cols["create_time"].astype(object)  # datetime.datetime for the DateTime column
+    lists = {name: cols[name].tolist() for name in COLUMNS}
+    total = len(lists["dev_id"])
+    for lo in range(0, total, batch_rows):
+        hi = min(lo + batch_rows, total)
+        rows = [
+            dict(zip(COLUMNS, values))
+            for values in zip(*(lists[name][lo:hi] for name in COLUMNS))
+        ]
+        crud.insert_readings(db, rows)
+    return total
+
+
+class CSVSink:
+    """Plain-text fixture with the readings formatted like environment_monitor stores them."""
+
+    def __init__(self, path):
+        self.file = open(path, "w", newline="", encoding="utf-8")
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(COLUMNS)
+
+    def write(self, chunk, dev_ids):
+        cols = _formatted(chunk, dev_ids)
+        cols["create_time"] = np.datetime_as_string(cols["create_time"]).astype(object)
+        self.writer.writerows(zip(*(cols[name] for name in COLUMNS)))
+        return len(cols["dev_id"])
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetSink:
+    """Typed Parquet fixture (timestamp + float columns); needs the optional pyarrow package."""
+
+    def __init__(self, path):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit("Parquet output requires pyarrow (pip install pyarrow)")
+        self.pa = pa
+        self.schema = pa.schema([
+            ("create_time", pa.timestamp("s")),
+            ("dev_id", pa.dictionary(pa.int32(), pa.string())),
+            ("temp_num", pa.float32()),
+            ("rh_num", pa.float32()),
+            ("tvoc_num", pa.float32()),
+            ("pm_num", pa.float32()),
+            ("co2_num", pa.float32()),
+        ])
+        # Dictionary-encoding the noisy float columns only costs time; dev_id is what repeats
+        self.writer = pq.ParquetWriter(path, self.schema, use_dictionary=["dev_id"])
+
+    def write(self, chunk, dev_ids):
+        pa = self.pa
+        columns = [
+            pa.array(chunk["create_time"].astype("datetime64[s]")),
+            pa.DictionaryArray.from_arrays(chunk["dev_idx"].astype(np.int32), dev_ids),
+        ] + [pa.array(chunk[name].astype(np.float32)) for name in COLUMNS[2:]]
+        self.writer.write_table(pa.Table.from_arrays(columns, schema=self.schema))
+        return len(chunk["dev_idx"])
+
+    def close(self):
+        self.writer.close()
+
+
+def seed_yearly_data(db: Session, n_devices=10, year=2025, interval_minutes=10):
+    """
+    Generates mock sensor data for a full year into environment_monitor.
     Simulates seasonal temperature variations.
     """
     # Check if data already exists to avoid duplication
-    if db.query(models.SensorData).count() > 1000:
+    if crud.get_latest_reading(db) is not None:
         print("Data likely already seeded. Skipping.")
         return
 
     print("Seeding yearly data... this may take a moment.")
-    
-    start_date = datetime.date(2025, 1, 1)
-    end_date = datetime.date(2025, 12, 31)
-    delta = datetime.timedelta(days=1)
-    
-    current_date = start_date
-    batch = []
-    
-    while current_date <= end_date:
-        # Seasonality: 
-        # Jan (0) -> Coldest
-        # July (6) -> Hottest
-        # Cosine wave: -cos(x) peaks at pi (halfway)
-        
-        day_of_year = current_date.timetuple().tm_yday
-        # Normalized 0 to 2pi
-        season_factor = (day_of_year / 365.0) * 2 * math.pi
-        # Base temp 22, variation +/- 8. Jan/Dec cold, July hot.
-        # -cos(0) = -1 (cold), -cos(pi) = 1 (hot)
-        seasonal_temp_base = 22 - 8 * math.cos(season_factor) 
-        
-        # Working hours 09:00 - 18:00
-        for hour in range(9, 19):
-            # Daily variation: Cool in morning, Peak at 14:00, Cool in evening
-            # 09:00 -> -2, 14:00 -> +3, 18:00 -> +0
-            hour_factor = (hour - 9) / 9.0 # 0 to 1
-            # Parabola peaking around 0.5
-            daily_variation = -2 + 5 * math.sin(hour_factor * math.pi)
-            
-            # Random noise
-            noise = random.uniform(-1.0, 1.0)
-            
-            final_temp = seasonal_temp_base + daily_variation + noise
-            
-            # Humidity: Inverse to temp usually
-            final_rh = 50 - (daily_variation * 2) + random.uniform(-5, 5)
-            final_rh = max(20, min(90, final_rh))
-            
-            # Velocity: Random
-            final_vel = random.uniform(0.05, 0.3)
-            
-            timestamp = datetime.datetime.combine(current_date, datetime.time(hour, 0))
-            
-            # Create object (using ORM directly for speed, bypass CRUD overhead if possible, or use bulk)
-            data = models.SensorData(
-                timestamp=timestamp,
-                temperature=final_temp,
-                humidity=final_rh,
-                air_velocity=final_vel,
-                mean_radiant_temperature=final_temp # Assume Tr = Ta
-            )
-            batch.append(data)
-            
-        current_date += delta
-        
-        # Batch insert every month or so to manage memory
-        if len(batch) > 500:
-            db.add_all(batch)
-            db.commit()
-            batch = []
-            
-    if batch:
-        db.add_all(batch)
-        db.commit()
-        
+    dev_ids = make_dev_ids(n_devices)
+    for _, chunk in generate(datetime.date(year, 1, 1), datetime.date(year, 12, 31), n_devices, interval_minutes):
+        load_into_db(db, chunk, dev_ids)
     print("Seeding complete.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic environment_monitor data")
+    parser.add_argument("--devices", type=int, default=100)
+    parser.add_argument("--start", default="2025-01-01")
+    parser.add_argument("--end", default="2025-12-31")
+    parser.add_argument("--interval", type=int, default=1, help="minutes between readings per device")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="db", help="'db' to load into the database, or a .csv / .parquet path")
+    args = parser.parse_args()
+
+    start_date = datetime.date.fromisoformat(args.start)
+    end_date = datetime.date.fromisoformat(args.end)
+    dev_ids = make_dev_ids(args.devices)
+
+    db = None
+    sink = None
+    if args.out == "db":
+        # A fresh sqlite/duckdb file has no tables yet
+        models.Base.metadata.create_all(bind=database.get_engine())
+        db = database.SessionLocal()
+    elif args.out.endswith(".parquet"):
+        sink = ParquetSink(args.out)
+    elif args.out.endswith(".csv"):
+        sink = CSVSink(args.out)
+    else:
+        raise SystemExit("--out must be 'db', a .csv path or a .parquet path")
+
+    started = time.perf_counter()
+    total = 0
+    try:
+        for day, chunk in generate(start_date, end_date, args.devices, args.interval, args.seed):
+            total += load_into_db(db, chunk, dev_ids) if db is not None else sink.write(chunk, dev_ids)
+            elapsed = time.perf_counter() - started
+            print(f"{day}: {total:,} rows, {total / elapsed:,.0f} rows/s")
+    finally:
+        if db is not None:
+            db.close()
+        if sink is not None:
+            sink.close()
+    print(f"Wrote {total:,} rows for {args.devices} devices in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+import os
+import threading
+import time
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class StartupReport:
+    """
+    Wall time of each startup phase, logged as it finishes and served by /api/ready.
+    Phases that are not needed to answer requests (database, CLO model, fits) run in one
+    background thread; `warm` is set when it is done.
+    """
+
+    def __init__(self, origin=None):
+        self.started_at = datetime.now()
+        self.phases = []
+        self.warm = threading.Event()
+        # Seconds from `origin` (a perf_counter value, default now) until the warm-up finished
+        self.warm_after = None
+        self._origin = origin if origin is not None else time.perf_counter()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def record(self, name, seconds, background=False, error=None):
+        with self._lock:
+            self.phases.append({
+                "name": name,
+                "ms": round(seconds * 1000, 1),
+                "background": background,
+                "error": error,
+            })
+        status = f" (failed: {error})" if error else ""
+        print(f"Startup phase {name}: {seconds * 1000:.0f} ms{status}")
+
+    def run(self, name, fn, background=False):
+        """Run one phase, recording its time; failures are logged, not raised. Returns True on success."""
+        started = time.perf_counter()
+        error = None
+        try:
+            fn()
+        except Exception as e:
+            error = str(e)
+        self.record(name, time.perf_counter() - started, background, error)
+        return error is None
+
+    def run_in_background(self, steps):
+        """Run [(name, fn), ...] in order in a daemon thread, then set `warm`."""
+        def _run():
+            for name, fn in steps:
+                self.run(name, fn, background=True)
+            self.warm_after = time.perf_counter() - self._origin
+            self.warm.set()
+            print(self.summary())
+
+        self._thread = threading.Thread(target=_run, name="startup-warmup", daemon=True)
+        self._thread.start()
+
+    def summary(self):
+        with self._lock:
+            phases = ", ".join(f"{p['name']} {p['ms']:.0f} ms" for p in self.phases)
+        return f"Startup warm after {self.warm_after:.2f}s: {phases}"
+
+    def info(self):
+        with self._lock:
+            phases = list(self.phases)
+        return {
+            "started_at": self.started_at.isoformat(timespec="seconds"),
+            "warm": self.warm.is_set(),
+            "warm_after_s": round(self.warm_after, 3) if self.warm_after is not None else None,
+            "phases": phases,
+        }
+
+
+class FileLock:
+    """
+    Lock shared by the worker processes of one host, on a file next to the data it guards.
+    The OS releases it when the holding process exits, so a crashed worker never leaves it stuck.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._fd = None
+        self._lock = threading.Lock()
+
+    def acquire(self, blocking=True):
+        """Returns True once the lock is held; with blocking=False, False if another process has it."""
+        if not self._lock.acquire(blocking):
+            return False
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        while True:
+            try:
+                if fcntl is not None:
+                    fcntl.flock(fd, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+                else:
+                    msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+                self._fd = fd
+                return True
+            except OSError:
+                if not blocking:
+                    os.close(fd)
+                    self._lock.release()
+                    return False
+                time.sleep(0.5)
+
+    def release(self):
+        fd, self._fd = self._fd, None
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        else:
+            msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        os.close(fd)
+        self._lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
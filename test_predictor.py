@@ -31,5 +31,19 @@ def example_custom_dates():
         clo = predictor.predict(date) 
         print(f"  {date} ({holiday}): CLO = {clo:.4f}") 
 
+def example_year_curve():
+    """整年 CLO 曲线（向量化）示例"""
+    print("\n" + "="*70)
+    print("示例7: 整年CLO曲线".center(70))
+    print("="*70)
+
+    predictor = CLOPredictor('best_clo_model.json')
+    curve = predictor.predict_range('2025-01-01', '2025-12-31')
+
+    print(f"\n  天数: {len(curve)}")
+    print(f"  最小 CLO: {curve.min():.4f}  (第 {curve.argmin() + 1} 天)")
+    print(f"  最大 CLO: {curve.max():.4f}  (第 {curve.argmax() + 1} 天)")
+
 if __name__ == "__main__":
     example_custom_dates()
+    example_year_curve()
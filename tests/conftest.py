@@ -0,0 +1,53 @@
+import datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend import crud, models
+
+
+@pytest.fixture
+def engine(tmp_path):
+    """Empty SQLite database with the application tables."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'pmv.db'}", connect_args={"check_same_thread": False})
+    models.Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def session_factory(engine):
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def reading(create_time, dev_id="SJ-A0-C01-06F-00-CGQ-0001", temp=22.5, rh=45.0):
+    """One environment_monitor row as crud.insert_readings takes it."""
+    if isinstance(create_time, str):
+        create_time = datetime.datetime.fromisoformat(create_time)
+    return {
+        "create_time": create_time,
+        "dev_id": dev_id,
+        "temp_num": None if temp is None else str(temp),
+        "rh_num": None if rh is None else str(rh),
+    }
+
+
+def insert(session_factory, rows):
+    with session_factory() as db:
+        crud.insert_readings(db, rows)
+
+
+@pytest.fixture
+def client(engine, monkeypatch):
+    """TestClient on the app with its database swapped for the temporary SQLite one and empty caches."""
+    from fastapi.testclient import TestClient
+
+    from backend import aggregation, database, main, result_cache
+
+    monkeypatch.setattr(database, "_engine", engine)
+    aggregation.aggregation_service.clear()
+    result_cache.result_cache.clear()
+    yield TestClient(main.app)
+    aggregation.aggregation_service.clear()
+    result_cache.result_cache.clear()
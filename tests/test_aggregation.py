@@ -0,0 +1,54 @@
+import datetime
+
+from backend import aggregation
+from conftest import insert, reading
+
+START = datetime.date(2025, 1, 1)
+END = datetime.date(2025, 1, 2)
+
+
+def _changes(session_factory, since):
+    with session_factory() as db:
+        return aggregation.query_changes(db, START, END, None, since)
+
+
+def test_returned_watermark_has_no_further_changes(session_factory):
+    insert(session_factory, [
+        reading("2025-01-01 09:15:00"),
+        reading("2025-01-01 10:30:00"),
+        reading("2025-01-02 14:05:00", dev_id="SJ-A0-C01-07F-00-CGQ-0002"),
+    ])
+
+    cells, watermark = _changes(session_factory, "2025-01-01 00:00:00")
+    assert cells == [("2025-01-01", 9), ("2025-01-01", 10), ("2025-01-02", 14)]
+    assert watermark == "2025-01-02 14:05:00"
+
+    assert _changes(session_factory, watermark) == ([], watermark)
+
+
+def test_watermark_advances_with_new_readings(session_factory):
+    insert(session_factory, [reading("2025-01-01 09:15:00")])
+    _, watermark = _changes(session_factory, "2025-01-01 00:00:00")
+
+    insert(session_factory, [reading("2025-01-01 09:15:01"), reading("2025-01-01 11:00:00")])
+    cells, watermark = _changes(session_factory, watermark)
+    assert cells == [("2025-01-01", 9), ("2025-01-01", 11)]
+    assert watermark == "2025-01-01 11:00:00"
+    assert _changes(session_factory, watermark) == ([], watermark)
+
+
+def test_watermark_keeps_fractional_seconds(session_factory):
+    insert(session_factory, [reading(datetime.datetime(2025, 1, 1, 9, 15, 0, 250000))])
+    cells, watermark = _changes(session_factory, "2025-01-01 09:15:00")
+    assert cells == [("2025-01-01", 9)]
+    assert watermark == "2025-01-01 09:15:00.250000"
+    assert _changes(session_factory, watermark) == ([], watermark)
+
+
+def test_latest_reading(session_factory):
+    with session_factory() as db:
+        assert aggregation.latest_reading(db, START, END) is None
+    insert(session_factory, [reading("2025-01-01 09:15:00"), reading("2025-01-01 20:00:00")])
+    with session_factory() as db:
+        # 20:00 is outside working hours, so it is not a dashboard reading
+        assert aggregation.latest_reading(db, START, END) == "2025-01-01 09:15:00"
@@ -0,0 +1,96 @@
+import datetime
+import time
+
+import pytest
+
+from backend import main
+from conftest import insert, reading
+
+TODAY = datetime.date.today()
+
+
+def _at(hour, minute=0):
+    return datetime.datetime.combine(TODAY, datetime.time(hour, minute))
+
+
+def _params(**extra):
+    return dict(start_date=TODAY.isoformat(), end_date=TODAY.isoformat(), clo_strategy="manual", **extra)
+
+
+def _hourly(client, **extra):
+    response = client.get("/api/pmv-hourly-heatmap", params=_params(**extra))
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def _trend(client, **extra):
+    response = client.get("/api/daily-trend", params=_params(**extra))
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_full_load_after_a_new_reading_covers_its_watermark(client, session_factory):
+    insert(session_factory, [reading(_at(9, 5), temp=20.0)])
+    first = _hourly(client)
+    assert [cell[1] for cell in first["data"]] == [0]
+
+    # Inside the aggregate and result cache TTLs
+    insert(session_factory, [reading(_at(10, 0), temp=26.0)])
+    full = _hourly(client)
+    assert full["watermark"] == _at(10, 0).isoformat(sep=" ")
+    assert [cell[1] for cell in full["data"]] == [0, 1]
+
+    delta = _hourly(client, since=full["watermark"])
+    assert delta["data"] == []
+    assert delta["watermark"] == full["watermark"]
+
+
+def test_delta_after_a_full_load_adds_newer_readings(client, session_factory):
+    insert(session_factory, [reading(_at(9, 5), temp=20.0)])
+    full = _hourly(client)
+    insert(session_factory, [reading(_at(11, 30), temp=26.0)])
+
+    delta = _hourly(client, since=full["watermark"])
+    assert [cell[1] for cell in delta["data"]] == [2]
+    assert delta["watermark"] == _at(11, 30).isoformat(sep=" ")
+
+
+def test_daily_trend_full_load_is_not_older_than_its_watermark(client, session_factory):
+    insert(session_factory, [reading(_at(9, 5), temp=20.0)])
+    assert _trend(client)["data"][0]["avg_temp"] == 20.0
+
+    insert(session_factory, [reading(_at(10, 0), temp=26.0)])
+    full = _trend(client)
+    assert full["watermark"] == _at(10, 0).isoformat(sep=" ")
+    assert full["data"][0]["avg_temp"] == 23.0
+    assert _trend(client, since=full["watermark"])["data"] == []
+
+
+@pytest.fixture
+def shanghai_time(monkeypatch):
+    """Run with a local timezone of UTC+8, so offsets in `since` actually matter."""
+    if not hasattr(time, "tzset"):
+        pytest.skip("time.tzset is not available on this platform")
+    monkeypatch.setenv("TZ", "Asia/Shanghai")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def test_parse_since_converts_offsets_to_local_time(shanghai_time):
+    assert main.parse_since("2025-10-01T02:00:00Z") == "2025-10-01 10:00:00"
+    assert main.parse_since("2025-10-01T10:00:00+08:00") == "2025-10-01 10:00:00"
+    assert main.parse_since("2025-10-01T10:00:00") == "2025-10-01 10:00:00"
+
+
+def test_delta_with_an_offset_bearing_since(client, session_factory, shanghai_time):
+    insert(session_factory, [reading("2025-10-01 09:30:00"), reading("2025-10-01 10:30:00")])
+    params = dict(start_date="2025-10-01", end_date="2025-10-01", clo_strategy="manual")
+
+    # 02:00Z is 10:00 local: only the 10:30 reading is newer
+    response = client.get("/api/pmv-hourly-heatmap", params=dict(params, since="2025-10-01T02:00:00Z"))
+    body = response.json()
+    assert body["since"] == "2025-10-01 10:00:00"
+    assert [cell[1] for cell in body["data"]] == [1]
+    assert body["watermark"] == "2025-10-01 10:30:00"
@@ -0,0 +1,47 @@
+import pytest
+
+from backend import devices
+from conftest import insert, reading
+
+
+@pytest.mark.parametrize("floor, expected", [
+    ("6", "6F"),
+    ("6f", "6F"),
+    (" 06F ", "6F"),
+    ("14F", "14F"),
+    ("0F", "0F"),
+    ("SJ-A0-C01-06F", "SJ-A0-C01-6F"),
+    ("sj-a0-c01-6f", "SJ-A0-C01-6F"),
+    ("SJ-A0-C01-14F", "SJ-A0-C01-14F"),
+])
+def test_normalize_floor(floor, expected):
+    assert devices.normalize_floor(floor) == expected
+
+
+def test_parse_dev_id_with_and_without_system():
+    code = devices.parse_dev_id("SJ-A0-C01-14F-00-HL-CGQ-0005")
+    assert (code.floor, code.zone, code.system, code.sensor_no) == ("14F", "00", "HL", "0005")
+    code = devices.parse_dev_id("SJ-A0-C01-06F-00-CGQ-0001")
+    assert (code.floor, code.system, code.device_type) == ("06F", None, "CGQ")
+    assert devices.parse_dev_id("sensor-1") is None
+    assert devices.floor_key("SJ-A0-C01-06F-00-CGQ-0001") == "SJ-A0-C01-06F"
+
+
+def test_resolve_matches_floor_keys_regardless_of_padding(session_factory):
+    insert(session_factory, [
+        reading("2025-01-01 09:00:00", dev_id="SJ-A0-C01-06F-00-CGQ-0001"),
+        reading("2025-01-01 09:00:00", dev_id="SJ-A0-C01-6F-01-CGQ-0002"),
+        reading("2025-01-01 09:00:00", dev_id="SJ-A0-C01-14F-00-HL-CGQ-0005"),
+        reading("2025-01-01 09:00:00", dev_id="SJ-B0-C01-06F-00-CGQ-0003"),
+        reading("2025-01-01 09:00:00", dev_id="sensor-1"),
+    ])
+    registry = devices.DeviceRegistry(session_factory, interval=0)
+    assert registry.run_once() == 5
+
+    same_floor = ["SJ-A0-C01-06F-00-CGQ-0001", "SJ-A0-C01-6F-01-CGQ-0002"]
+    assert registry.resolve(floor="SJ-A0-C01-06F") == same_floor
+    assert registry.resolve(floor="sj-a0-c01-6f") == same_floor
+    assert registry.resolve(floor="6F") == same_floor + ["SJ-B0-C01-06F-00-CGQ-0003"]
+    assert registry.resolve(floor="SJ-A0-C01-06F", zone="01") == ["SJ-A0-C01-6F-01-CGQ-0002"]
+    assert registry.resolve(floor="SJ-A0-C01-7F") == []
+    assert registry.info()["unparsed"] == ["sensor-1"]
@@ -0,0 +1,83 @@
+import datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend import calc, models
+from conftest import insert, reading
+
+
+@pytest.fixture(autouse=True)
+def fourier_cache(tmp_path, monkeypatch):
+    path = tmp_path / "fourier_params.json"
+    monkeypatch.setattr(calc, "FOURIER_CACHE_PATH", str(path))
+    monkeypatch.setattr(calc, "FOURIER_PARAMS", None)
+    monkeypatch.setattr(calc, "FOURIER_FIT_INFO", None)
+    return path
+
+
+def _seed_days(session_factory, start, days):
+    rows = []
+    for d in range(days):
+        day = start + datetime.timedelta(days=d)
+        for hour in (9, 12, 15):
+            rows.append(reading(datetime.datetime.combine(day, datetime.time(hour)), temp=18 + (d % 10)))
+    insert(session_factory, rows)
+
+
+def _fit(session_factory, **kwargs):
+    with session_factory() as db:
+        return calc.fit_fourier_coefficients(db, **kwargs)
+
+
+def test_fit_records_its_source(session_factory, engine):
+    _seed_days(session_factory, datetime.date(2025, 1, 1), 30)
+    assert _fit(session_factory) is not None
+
+    source = calc.FOURIER_FIT_INFO["source"]
+    assert source["database"] == calc.database_fingerprint(engine.url)
+    assert source["rows"] == 90
+    assert source["first_time"].startswith("2025-01-01 09:00:00")
+    assert source["last_time"].startswith("2025-01-30 15:00:00")
+
+
+def test_unchanged_data_skips_the_refit(session_factory):
+    _seed_days(session_factory, datetime.date(2025, 1, 1), 30)
+    _fit(session_factory)
+    fitted = calc.FOURIER_FIT_INFO
+
+    _fit(session_factory)
+    assert calc.FOURIER_FIT_INFO is fitted
+
+
+def test_new_rows_on_the_same_day_refit(session_factory):
+    _seed_days(session_factory, datetime.date(2025, 1, 1), 30)
+    _fit(session_factory)
+    fitted = calc.FOURIER_FIT_INFO
+
+    insert(session_factory, [reading("2025-01-30 16:00:00", temp=30)])
+    _fit(session_factory)
+    assert calc.FOURIER_FIT_INFO is not fitted
+    assert calc.FOURIER_FIT_INFO["source"]["rows"] == 91
+
+
+def test_cache_from_another_database_is_ignored(session_factory, engine, tmp_path, fourier_cache):
+    _seed_days(session_factory, datetime.date(2025, 1, 1), 30)
+    _fit(session_factory)
+    assert fourier_cache.exists()
+
+    other = create_engine(f"sqlite:///{tmp_path / 'other.db'}")
+    models.Base.metadata.create_all(bind=other)
+    assert calc.load_fourier_cache(database_url=other.url) is None
+    assert calc.load_fourier_cache(database_url=engine.url) == calc.FOURIER_PARAMS
+
+    # Same last day, different data: the fit made on the first database is not reused
+    calc.load_fourier_cache()
+    other_factory = sessionmaker(bind=other)
+    _seed_days(other_factory, datetime.date(2025, 1, 25), 6)
+    with other_factory() as db:
+        calc.fit_fourier_coefficients(db)
+    assert calc.FOURIER_FIT_INFO["source"]["database"] == calc.database_fingerprint(other.url)
+    assert calc.FOURIER_FIT_INFO["n_days"] == 6
+    other.dispose()
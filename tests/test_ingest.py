@@ -0,0 +1,180 @@
+import datetime
+
+import pytest
+
+from backend import aggregation, crud, ingest, models, result_cache, rollup
+from conftest import insert, reading
+
+DAY = datetime.date(2025, 1, 1)
+
+
+@pytest.fixture
+def writer(session_factory):
+    writer = ingest.IngestWriter(session_factory, flush_interval=0.05)
+    yield writer
+    writer.stop()
+
+
+@pytest.fixture
+def rolled_up(session_factory):
+    """Readings 09:00-17:59 on DAY, rolled up through 18:00."""
+    insert(session_factory, [
+        reading(datetime.datetime(2025, 1, 1, hour, 30), temp=20 + hour % 3) for hour in range(9, 18)
+    ])
+    with session_factory() as db:
+        rollup.refresh_rollup(db, now=datetime.datetime(2025, 1, 1, 18, 5))
+        assert rollup.get_watermark(db) == datetime.datetime(2025, 1, 1, 18)
+
+
+def _hourly_counts(session_factory):
+    with session_factory() as db:
+        aggregates = aggregation.query_hourly(db, DAY, DAY)
+    return dict(zip(aggregates.hours.tolist(), aggregates.counts.tolist()))
+
+
+def _ingest(writer, rows):
+    assert writer.submit(rows)
+    writer.flush()
+
+
+def test_backfilled_rows_reach_the_rollup(session_factory, rolled_up, writer):
+    assert _hourly_counts(session_factory)[10] == 1
+    _ingest(writer, [
+        reading("2025-01-01 10:45:00", dev_id="LATE", temp=30.0),
+        reading("2025-01-01 11:05:00", dev_id="LATE", temp=31.0),
+        reading("2025-01-01 18:10:00", dev_id="LATE", temp=25.0),
+    ])
+
+    counts = _hourly_counts(session_factory)
+    assert (counts[10], counts[11], counts[18]) == (2, 2, 1)
+    assert writer.stats["backfilled"] == 2
+    with session_factory() as db:
+        # Rebuilt in place, the watermark doesn't move
+        assert rollup.get_watermark(db) == datetime.datetime(2025, 1, 1, 18)
+    with session_factory() as db:
+        aggregates = aggregation.query_hourly(db, DAY, DAY)
+    _, _, temps, _ = aggregates.hourly()
+    assert temps[aggregates.hours.tolist().index(10)] == pytest.approx((21 + 30) / 2)
+
+
+def test_backfilled_days_leave_the_result_cache(rolled_up, writer):
+    cache = result_cache.result_cache
+    other_day = DAY + datetime.timedelta(days=1)
+    cache.store("trend:test", DAY, [{"temp": 21}])
+    cache.store("trend:test", other_day, [{"temp": 22}])
+
+    _ingest(writer, [reading("2025-01-01 12:00:00", dev_id="LATE")])
+    found, missing = cache.lookup("trend:test", [DAY, other_day])
+    assert missing == [DAY]
+    assert list(found) == [other_day]
+    cache.clear()
+
+
+def test_closed_days_expire_for_workers_that_missed_the_backfill(monkeypatch):
+    # Another worker's cache: it never sees invalidate_days, only the TTL
+    cache = result_cache.DayResultCache(closed_ttl=600)
+    now = [1000.0]
+    monkeypatch.setattr(result_cache.time, "monotonic", lambda: now[0])
+    cache.store("trend:test", DAY, [{"temp": 21}])
+    assert cache.lookup("trend:test", [DAY])[1] == []
+    now[0] += 601
+    assert cache.lookup("trend:test", [DAY])[1] == [DAY]
+
+    cache = result_cache.DayResultCache(closed_ttl=0)
+    cache.store("trend:test", DAY, [{"temp": 21}])
+    now[0] += 10 ** 6
+    assert cache.lookup("trend:test", [DAY])[1] == []
+
+
+def test_rows_after_the_watermark_are_left_to_the_rollup_job(session_factory, rolled_up, writer):
+    _ingest(writer, [reading("2025-01-01 18:20:00", dev_id="LATE")])
+    assert writer.stats["backfilled"] == 0
+    assert _hourly_counts(session_factory)[18] == 1
+
+
+def test_refresh_hours_groups_consecutive_hours(session_factory, rolled_up):
+    hours = [datetime.datetime(2025, 1, 1, h) for h in (9, 10, 11, 15)]
+    with session_factory() as db:
+        assert rollup.refresh_hours(db, hours) == 4
+    assert _hourly_counts(session_factory) == {h: 1 for h in range(9, 18)}
+
+
+class FlakyInsert:
+    """crud.insert_readings that raises for the first `failures` calls."""
+
+    insert_readings = staticmethod(crud.insert_readings)
+
+    def __init__(self, failures):
+        self.failures = failures
+        self.calls = 0
+
+    def __call__(self, db, rows):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise RuntimeError("database unavailable")
+        return self.insert_readings(db, rows)
+
+
+def _stored(session_factory):
+    with session_factory() as db:
+        return db.query(models.EnvironmentMonitor).count()
+
+
+@pytest.fixture
+def retrying_writer(session_factory):
+    writer = ingest.IngestWriter(session_factory, flush_interval=60, max_attempts=3, retry_backoff=0)
+    yield writer
+    writer.stop()
+
+
+def test_failed_batch_is_retried(session_factory, retrying_writer, monkeypatch):
+    monkeypatch.setattr(ingest.crud, "insert_readings", FlakyInsert(failures=2))
+    rows = [reading(f"2025-01-01 09:0{i}:00") for i in range(3)]
+    assert retrying_writer.submit(rows)
+
+    assert retrying_writer.flush() == 0
+    assert retrying_writer.flush() == 0
+    assert retrying_writer.queue_depth == 3
+    assert retrying_writer.flush() == 3
+
+    assert _stored(session_factory) == 3
+    assert retrying_writer.stats["retried"] == 6
+    assert retrying_writer.stats["failed"] == 0
+    assert retrying_writer.queue_depth == 0
+
+
+def test_rows_fail_only_after_the_last_attempt(session_factory, retrying_writer, monkeypatch):
+    monkeypatch.setattr(ingest.crud, "insert_readings", FlakyInsert(failures=10))
+    assert retrying_writer.submit([reading("2025-01-01 09:00:00")])
+
+    for _ in range(2):
+        retrying_writer.flush()
+        assert retrying_writer.stats["failed"] == 0
+    retrying_writer.flush()
+    assert retrying_writer.stats["failed"] == 1
+    assert retrying_writer.stats["last_error"] == "database unavailable"
+    assert retrying_writer.queue_depth == 0
+
+
+def test_retries_wait_for_their_backoff(session_factory, monkeypatch):
+    monkeypatch.setattr(ingest.crud, "insert_readings", FlakyInsert(failures=1))
+    writer = ingest.IngestWriter(session_factory, flush_interval=60, retry_backoff=30)
+    assert writer.submit([reading("2025-01-01 09:00:00")])
+
+    writer.flush()
+    assert writer.flush() == 0  # not due yet
+    assert writer.info()["retry_depth"] == 1
+    # Shutdown gives pending retries a last attempt regardless of their backoff
+    writer.stop()
+    assert _stored(session_factory) == 1
+    assert writer.queue_depth == 0
+
+
+def test_retrying_rows_count_towards_the_queue_limit(session_factory, monkeypatch):
+    monkeypatch.setattr(ingest.crud, "insert_readings", FlakyInsert(failures=10))
+    writer = ingest.IngestWriter(session_factory, flush_interval=60, queue_max=2, retry_backoff=30)
+    assert writer.submit([reading("2025-01-01 09:00:00"), reading("2025-01-01 09:01:00")])
+    writer.flush()
+    assert not writer.submit([reading("2025-01-01 09:02:00")])
+    assert writer.stats["refused"] == 1
+    writer.stop()
@@ -0,0 +1,54 @@
+from backend import live
+from conftest import insert, reading
+
+
+def _poll(poller, session_factory):
+    with session_factory() as db:
+        return poller.poll(db)
+
+
+def test_starts_after_the_latest_reading(session_factory):
+    insert(session_factory, [reading("2025-01-01 09:00:00"), reading("2025-01-01 09:00:00", dev_id="B")])
+    poller = live.LivePoller(session_factory, interval=0)
+    assert _poll(poller, session_factory) == ([], "2025-01-01 09:00:00")
+    assert _poll(poller, session_factory) == ([], "2025-01-01 09:00:00")
+
+
+def test_last_reading_is_not_repeated(session_factory):
+    poller = live.LivePoller(session_factory, interval=0)
+    _poll(poller, session_factory)
+    insert(session_factory, [reading("2025-01-01 09:00:00", temp=24.0)])
+
+    readings, watermark = _poll(poller, session_factory)
+    assert [(r["time"], r["temp"]) for r in readings] == [("2025-01-01 09:00:00", 24.0)]
+    assert watermark == "2025-01-01 09:00:00"
+    assert _poll(poller, session_factory) == ([], watermark)
+
+
+def test_rows_sharing_a_timestamp_across_the_limit(session_factory, monkeypatch):
+    monkeypatch.setattr(live, "LIVE_MAX_ROWS", 2)
+    poller = live.LivePoller(session_factory, interval=0)
+    _poll(poller, session_factory)
+    insert(session_factory, [reading("2025-01-01 09:00:00", dev_id=f"D{i}") for i in range(5)])
+
+    seen = []
+    for _ in range(3):
+        readings, _ = _poll(poller, session_factory)
+        seen += [r["dev_id"] for r in readings]
+    assert seen == ["D0", "D1", "D2", "D3", "D4"]
+    assert _poll(poller, session_factory)[0] == []
+
+
+def test_unparseable_values_are_skipped(session_factory):
+    poller = live.LivePoller(session_factory, interval=0)
+    _poll(poller, session_factory)
+    # SQLite's CAST('22abc' AS REAL) is 22, so the row passes the SQL filter like on MySQL
+    insert(session_factory, [
+        reading("2025-01-01 09:00:00", dev_id="A", temp="22abc"),
+        reading("2025-01-01 09:00:00", dev_id="B", temp=23.5),
+    ])
+
+    readings, watermark = _poll(poller, session_factory)
+    assert [r["dev_id"] for r in readings] == ["B"]
+    assert readings[0]["pmv"] is not None
+    assert _poll(poller, session_factory) == ([], watermark)
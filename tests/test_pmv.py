@@ -0,0 +1,63 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from backend import calc
+
+# user-001: the vectorized solver must follow the scalar VBA path to within 1e-6 PMV / PPD
+TOLERANCE = 1e-6
+
+TA = (10.0, 16.0, 20.5, 24.0, 28.0, 33.0)
+RH = (15.0, 45.0, 80.0)
+VEL = (0.05, 0.15, 0.6)
+TR_OFFSET = (-3.0, 0.0, 4.0)
+CLO = (0.0, 0.3, 0.5, 1.0, 1.8)
+MET = (0.8, 1.2, 2.0, 3.5)
+
+
+def _input_grid():
+    rows = [
+        (ta, rh, vel, ta + dtr, clo, met)
+        for ta, rh, vel, dtr, clo, met in itertools.product(TA, RH, VEL, TR_OFFSET, CLO, MET)
+    ]
+    return np.array(rows).T
+
+
+@pytest.mark.parametrize("solver", calc.TCL_SOLVERS)
+def test_vectorized_matches_scalar(solver):
+    ta, rh, vel, tr, clo, met = _input_grid()
+    info = {}
+    pmv, ppd = calc.get_thermal_comfort_vba_vec(ta, rh, vel, tr, clo, met, solver=solver, info=info)
+
+    expected = np.array([
+        calc.get_thermal_comfort_vba_base(*args, solver=solver)
+        for args in zip(ta, rh, vel, tr, clo, met)
+    ])
+    assert np.all(np.isfinite(pmv))
+    assert np.max(np.abs(pmv - expected[:, 0])) <= TOLERANCE
+    assert np.max(np.abs(ppd - expected[:, 1])) <= TOLERANCE
+    assert info["converged"].all()
+
+
+@pytest.mark.parametrize("solver", calc.TCL_SOLVERS)
+def test_vectorized_iterations_match_scalar(solver):
+    ta, rh, vel, tr, clo, met = _input_grid()
+    info = {}
+    calc.get_thermal_comfort_vba_vec(ta, rh, vel, tr, clo, met, solver=solver, info=info)
+
+    for i, args in enumerate(zip(ta, rh, vel, tr, clo, met)):
+        scalar = {}
+        calc.get_thermal_comfort_vba_base(*args, solver=solver, info=scalar)
+        assert info["iterations"][i] == scalar["iterations"]
+        assert info["fallback"][i] == scalar["fallback"]
+
+
+def test_vectorized_broadcasts_scalars():
+    ta = np.array([[18.0, 22.0], [26.0, 30.0]])
+    pmv, ppd = calc.get_thermal_comfort_vba_vec(ta, 50, 0.15, ta, 0.6, 1.1)
+    assert pmv.shape == ppd.shape == ta.shape
+    for index, value in np.ndenumerate(ta):
+        expected_pmv, expected_ppd = calc.get_thermal_comfort_vba_base(value, 50, 0.15, value, 0.6, 1.1)
+        assert abs(pmv[index] - expected_pmv) <= TOLERANCE
+        assert abs(ppd[index] - expected_ppd) <= TOLERANCE
@@ -0,0 +1,55 @@
+from fastapi.testclient import TestClient
+
+from backend import calc, main
+
+client = TestClient(main.app)
+
+
+def _batch(**payload):
+    response = client.post("/api/calculate-pmv/batch", json=payload)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def _errors(body):
+    return {(e["index"], e["field"]) for e in body["errors"]}
+
+
+def test_columnar_batch_matches_scalar():
+    body = _batch(ta=[20.0, 26.0], rh=[50.0, 40.0], vel=[0.1, 0.2], clo=[1.0, 0.5], met=[1.2, 1.0])
+    assert body["count"] == 2
+    assert body["errors"] == []
+    pmv, ppd = calc.get_thermal_comfort_vba_base(26.0, 40.0, 0.2, 26.0, 0.5, 1.0)
+    assert body["pmv"][1] == round(pmv, 2)
+    assert body["ppd"][1] == round(ppd, 1)
+
+
+def test_out_of_range_rows_are_reported():
+    body = _batch(
+        ta=[22.0, -235.0, 22.0, 22.0],
+        rh=[50.0, 50.0, 50.0, 120.0],
+        vel=[0.1, 0.1, 0.1, 0.1],
+        clo=[0.5, 0.5, 0.5, 0.5],
+        met=[1.0, 1.0, 1e308, 1.0],
+    )
+    assert body["pmv"][0] is not None
+    assert body["pmv"][1:] == [None, None, None]
+    assert _errors(body) == {(1, "ta"), (2, "met"), (3, "rh")}
+
+
+def test_items_use_the_same_bounds():
+    body = _batch(items=[
+        {"ta": 22, "rh": 50, "vel": 0.1, "tr": 22, "clo": 0.5, "met": 1.0},
+        {"ta": 22, "rh": 50, "vel": 0.1, "tr": 22, "clo": 0.5, "met": 1e308},
+        {"ta": -235, "rh": 50, "vel": 0.1, "tr": 22, "clo": 0.5},
+    ])
+    assert body["pmv"][0] is not None
+    assert body["pmv"][1:] == [None, None]
+    assert _errors(body) == {(1, "met"), (2, "ta")}
+
+
+def test_every_returned_value_is_finite_or_has_an_error():
+    body = _batch(ta=[10.0, 30.0, 80.0], rh=[0.0, 100.0, 100.0], vel=[0.0, 5.0, 0.0], clo=[0.0, 4.0, 4.0], met=[0.5, 10.0, 10.0])
+    reported = {e["index"] for e in body["errors"]}
+    for i, value in enumerate(body["pmv"]):
+        assert (value is None) == (i in reported)
@@ -0,0 +1,130 @@
+import datetime
+import subprocess
+import sys
+import textwrap
+
+import numpy as np
+import pytest
+
+from backend import calc, startup
+from conftest import insert, reading
+
+
+def _held_elsewhere(path):
+    """Whether another process can take the lock at `path` right now."""
+    script = textwrap.dedent(f"""
+        import sys
+        from backend import startup
+        sys.exit(0 if startup.FileLock({str(path)!r}).acquire(blocking=False) else 1)
+    """)
+    return subprocess.run([sys.executable, "-c", script]).returncode == 1
+
+
+def test_file_lock_is_exclusive_between_processes(tmp_path):
+    lock = startup.FileLock(str(tmp_path / ".jobs.lock"))
+    assert not _held_elsewhere(lock.path)
+    assert lock.acquire(blocking=False)
+    assert _held_elsewhere(lock.path)
+    lock.release()
+    assert not _held_elsewhere(lock.path)
+
+
+def test_file_lock_context_manager(tmp_path):
+    lock = startup.FileLock(str(tmp_path / ".fit.lock"))
+    with lock:
+        assert _held_elsewhere(lock.path)
+    assert lock.acquire(blocking=False)
+    lock.release()
+
+
+@pytest.fixture
+def clo_models_cache(tmp_path, monkeypatch):
+    path = tmp_path / "clo_models.json"
+    monkeypatch.setattr(calc, "CLO_MODELS_CACHE_PATH", str(path))
+    monkeypatch.setattr(calc, "CLO_MODEL_MIN_DAYS", 5)
+    monkeypatch.setattr(calc, "CLO_MODELS", {})
+    return path
+
+
+def _fit(session_factory):
+    with session_factory() as db:
+        return calc.fit_clo_models(db, workers=1)
+
+
+def test_clo_models_are_loaded_while_the_data_is_unchanged(session_factory, clo_models_cache, monkeypatch):
+    insert(session_factory, [
+        reading(datetime.datetime(2025, 1, 1 + d, 10), temp=18 + d) for d in range(10)
+    ])
+    fitted = _fit(session_factory)
+    assert list(fitted) == ["device:SJ-A0-C01-06F-00-CGQ-0001", "floor:SJ-A0-C01-06F"]
+    assert clo_models_cache.exists()
+
+    # Another worker: same data, so the persisted models are used without fitting
+    fit_task = calc._fit_fourier_task
+    monkeypatch.setattr(calc, "CLO_MODELS", {})
+    monkeypatch.setattr(calc, "_fit_fourier_task", None)
+    assert _fit(session_factory) == fitted
+
+    monkeypatch.setattr(calc, "_fit_fourier_task", fit_task)
+    insert(session_factory, [reading("2025-01-20 10:00:00", temp=25)])
+    refitted = _fit(session_factory)
+    assert refitted["device:SJ-A0-C01-06F-00-CGQ-0001"]["n_days"] == 11
+
+
+def test_clo_models_predict_their_fitted_values(session_factory, clo_models_cache):
+    days = [datetime.date(2025, month, 15) for month in range(1, 11)]
+    insert(session_factory, [
+        reading(datetime.datetime(d.year, d.month, d.day, 10), temp=20.5 + 0.5 * i) for i, d in enumerate(days)
+    ])
+    params = _fit(session_factory)["device:SJ-A0-C01-06F-00-CGQ-0001"]["params"]
+    doys = [d.timetuple().tm_yday for d in days]
+    fitted = np.clip(calc._fourier_design(doys) @ np.array(params), 0.3, 1.5)
+
+    dev_ids = ["SJ-A0-C01-06F-00-CGQ-0001"]
+    assert [calc.clo_fourier_4(d, dev_ids) for d in days] == pytest.approx(fitted)
+    assert calc.clo_for_dates("fourier", days, dev_ids=dev_ids) == pytest.approx(fitted)
+
+
+def test_startup_fits_read_the_source_once(session_factory, clo_models_cache, tmp_path, monkeypatch):
+    monkeypatch.setattr(calc, "FOURIER_CACHE_PATH", str(tmp_path / "fourier_params.json"))
+    monkeypatch.setattr(calc, "FOURIER_PARAMS", None)
+    monkeypatch.setattr(calc, "FOURIER_FIT_INFO", None)
+    monkeypatch.setattr(calc, "CLO_MODEL_WORKERS", 1)
+    insert(session_factory, [
+        reading(datetime.datetime(2025, 1, 1 + d, 10), temp=18 + d) for d in range(10)
+    ])
+    reads = []
+    fit_source = calc._fit_source
+
+    def counting_fit_source(db):
+        reads.append(db)
+        return fit_source(db)
+
+    monkeypatch.setattr(calc, "_fit_source", counting_fit_source)
+
+    with session_factory() as db:
+        calc.fit_models(db)
+    assert len(reads) == 1
+    assert calc.FOURIER_FIT_INFO["source"]["rows"] == 10
+    assert len(calc.CLO_MODELS) == 2
+
+
+def test_readiness_fails_when_a_phase_failed(client, monkeypatch):
+    from backend import main
+
+    report = startup.StartupReport()
+    report.run("database", lambda: None, background=True)
+    report.warm.set()
+    monkeypatch.setattr(main, "startup_report", report)
+    monkeypatch.setattr(calc.model_registry, "_version", 1)
+    assert client.get("/api/ready", params={"warm": "true"}).json()["model_warm"] is True
+
+    def fail():
+        raise RuntimeError("tables could not be created")
+
+    report.run("background_jobs", fail, background=True)
+    response = client.get("/api/ready", params={"warm": "true"})
+    assert response.status_code == 503
+    detail = response.json()["detail"]
+    assert detail["model_warm"] is False
+    assert detail["errors"] == {"background_jobs": "tables could not be created"}